@@ -1,3 +1,6 @@
+import os
+import json
+
 from aws_cdk import (
     Aws,
     Stack,
@@ -11,6 +14,19 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from arm64_demo.workloads import DEFAULT_IMAGES, PLATFORMS, STAGES, Workload
+
+# Container type of the CodeBuild images of each platform
+IMAGE_TYPES = {"x86": "LINUX_CONTAINER", "arm64": "ARM_CONTAINER"}
+
+def build_image(name, platform):
+    # CodeBuild image by attribute name, e.g. STANDARD_4_0 (x86) or AMAZON_LINUX_2_ARM_2 (arm64). The container
+    # type decides the platform, LinuxBuildImage also holds the first ARM images (AMAZON_LINUX_2_ARM*)
+    for images in (codebuild.LinuxBuildImage, codebuild.LinuxArmBuildImage):
+        if name.isupper() and hasattr(images, name) and getattr(images, name).type == IMAGE_TYPES[platform]:
+            return getattr(images, name)
+    raise ValueError(f"Unknown CodeBuild image '{name}' for platform {platform}")
+
 class Arm64DemoStack(Stack):
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
@@ -21,6 +37,26 @@ class Arm64DemoStack(Stack):
 
         self.repository_name = "arm64_demo"
 
+        # Native image builds: "cold" rebuilds every layer (the demo timings), "cached" reuses Docker layers
+        # and pip wheels from previous runs (cdk deploy -c build_cache=cached)
+        self.build_cache = self.node.try_get_context("build_cache") or "cold"
+        if self.build_cache not in ("cold", "cached"):
+            raise ValueError(f"Unknown build_cache '{self.build_cache}', expected 'cold' or 'cached'")
+        # Pipeline layout: "sequential" runs one stage per concept, "parallel" runs every concept concurrently
+        # in one stage (cdk deploy -c layout=parallel)
+        self.layout = self.node.try_get_context("layout") or "sequential"
+        if self.layout not in ("sequential", "parallel"):
+            raise ValueError(f"Unknown layout '{self.layout}', expected 'sequential' or 'parallel'")
+        # Compute sweep: one benchmark build per platform, compute type and image. Compute types and images
+        # are lists for all platforms or per platform (ARM images only support SMALL and LARGE), e.g.
+        # cdk deploy -c sweep='{"compute_types": {"x86": ["MEDIUM", "LARGE", "X2_LARGE"], "arm64": ["SMALL", "LARGE"]},
+        #                       "images": {"x86": ["STANDARD_4_0", "STANDARD_5_0"]}}'
+        self.sweep = self.sweep_config(self.node.try_get_context("sweep"))
+        self.native_build_cache = (
+            codebuild.Cache.local(codebuild.LocalCacheMode.DOCKER_LAYER) if self.build_cache == "cached"
+            else codebuild.Cache.none()
+        )
+
         # Existing resources
         self.src_repository = codecommit.Repository.from_repository_name(self, "Arm64DemoCodeCommitRepo",
             repository_name=self.repository_name
@@ -38,6 +74,9 @@ class Arm64DemoStack(Stack):
             ),
             "AWS_REGION": codebuild.BuildEnvironmentVariable(
                 value=self.aws_region
+            ),
+            "BUILD_CACHE": codebuild.BuildEnvironmentVariable(
+                value=self.build_cache
             )
         }
 
@@ -81,430 +120,143 @@ class Arm64DemoStack(Stack):
 
         # Source code: CodeCommit Repo
         source_stage = pipeline.add_stage(stage_name="Source_Code")
-        source_output = codepipeline.Artifact("SourceArtifact")
+        self.source_output = codepipeline.Artifact("SourceArtifact")
         source_stage.add_action(codepipeline_actions.CodeCommitSourceAction(
             action_name="Source_Code",
             repository=self.src_repository,
-            output=source_output,
+            output=self.source_output,
             branch='main',
             run_order=1
         ))
 
-        # Build speed: Native
-        build_native_speed_stage = pipeline.add_stage(
-            placement=codepipeline.StagePlacement(
-                just_after=source_stage
-            ),
-            stage_name="Concept_1A_Build_Speed_Native"
-        )
-
-        build_native_speed_x86_project = codebuild.Project(self, "Native_Speed_x86_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            )
-        )
-        build_native_speed_x86_project.add_to_role_policy(self.codecommit_policy)
-        build_native_speed_x86_project.add_to_role_policy(self.ecr_ops_policy)
-        build_native_speed_x86_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_native_speed_arm64_project = codebuild.Project(self, "Native_Speed_arm64_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_native_speed_arm64_project.add_to_role_policy(self.codecommit_policy)
-        build_native_speed_arm64_project.add_to_role_policy(self.ecr_ops_policy)
-        build_native_speed_arm64_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_native_speed_multi_arch_project = codebuild.Project(self, "Native_Speed_Multi-Arch_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build_multi_arch.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_native_speed_multi_arch_project.add_to_role_policy(self.codecommit_policy)
-        build_native_speed_multi_arch_project.add_to_role_policy(self.ecr_ops_policy)
-        build_native_speed_multi_arch_project.add_to_role_policy(self.ecr_auth_policy)
-
-        envs = dict(self.environment_variables_base)
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="native_speed")})
-        envs.update({"CONTAINER_NAME": codebuild.BuildEnvironmentVariable(value="compute_bound_native")})
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="x86")})
-        build_native_speed_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Native_Speed_x86_Build",
-            input=source_output,
-            project=build_native_speed_x86_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="arm64")})
-        build_native_speed_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Native_Speed_arm64_Build",
-            input=source_output,
-            project=build_native_speed_arm64_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-        build_native_speed_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Native_Speed_Multi_Arch_Build",
-            input=source_output,
-            project=build_native_speed_multi_arch_project,
-            environment_variables=envs,
-            run_order=2
-        ))
-
-        # Build speed: Emulation
-        build_emulated_speed_stage = pipeline.add_stage(
-            placement=codepipeline.StagePlacement(
-                just_after=build_native_speed_stage
-            ),
-            stage_name="Concept_1B_Build_Speed_Emulated"
-        )
-
-        build_emulated_speed_project = codebuild.Project(self, "Emulated_Speed_Multi-Arch_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("emulated_speed/emulated_speed.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            ),
-            timeout=Duration.minutes(120)
-        )
-        build_emulated_speed_project.add_to_role_policy(self.codecommit_policy)
-        build_emulated_speed_project.add_to_role_policy(self.ecr_ops_policy)
-        build_emulated_speed_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_emulated_speed_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Emulated_Speed_Multi-Arch_Build",
-            input=source_output,
-            project=build_emulated_speed_project,
-            environment_variables=self.environment_variables_base,
-            run_order=1
-        ))
-
-        # Build Cases: Working
-        build_software_running_stage = pipeline.add_stage(
-            placement=codepipeline.StagePlacement(
-                just_after=build_emulated_speed_stage
-            ),
-            stage_name="Concept_2A_Software_Running"
-        )
-
-        build_software_running_x86_project = codebuild.Project(self, "Software_Running_x86_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            )
-        )
-        build_software_running_x86_project.add_to_role_policy(self.codecommit_policy)
-        build_software_running_x86_project.add_to_role_policy(self.ecr_ops_policy)
-        build_software_running_x86_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_software_running_arm64_project = codebuild.Project(self, "Software_Running_arm64_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_software_running_arm64_project.add_to_role_policy(self.codecommit_policy)
-        build_software_running_arm64_project.add_to_role_policy(self.ecr_ops_policy)
-        build_software_running_arm64_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_software_running_multi_arch_project = codebuild.Project(self, "Software_Running_Multi-Arch_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build_multi_arch.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_software_running_multi_arch_project.add_to_role_policy(self.codecommit_policy)
-        build_software_running_multi_arch_project.add_to_role_policy(self.ecr_ops_policy)
-        build_software_running_multi_arch_project.add_to_role_policy(self.ecr_auth_policy)
-
-        envs = dict(self.environment_variables_base)
-        envs.update({"CONTAINER_NAME": codebuild.BuildEnvironmentVariable(value="software_running")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="software_running")})
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="x86")})
-        build_software_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Software_Running_x86_Build",
-            input=source_output,
-            project=build_software_running_x86_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="arm64")})
-        build_software_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Software_Running_arm64_Build",
-            input=source_output,
-            project=build_software_running_arm64_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-        build_software_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Software_Running_Multi_Arch_Build",
-            input=source_output,
-            project=build_software_running_multi_arch_project,
-            environment_variables=envs,
-            run_order=2
-        ))
-
-        # Build Cases: Not Working
-        build_software_not_running_stage = pipeline.add_stage(
-            placement=codepipeline.StagePlacement(
-                just_after=build_software_running_stage
-            ),
-            stage_name="Concept_2B_Software_Not_Running"
-        )
-
-        build_python_x86_project = codebuild.Project(self, "Python_x86_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            )
-        )
-        build_python_x86_project.add_to_role_policy(self.codecommit_policy)
-        build_python_x86_project.add_to_role_policy(self.ecr_ops_policy)
-        build_python_x86_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_python_fixes_arm64_project = codebuild.Project(self, "Python_Fixes_arm64_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_python_fixes_arm64_project.add_to_role_policy(self.codecommit_policy)
-        build_python_fixes_arm64_project.add_to_role_policy(self.ecr_ops_policy)
-        build_python_fixes_arm64_project.add_to_role_policy(self.ecr_auth_policy)
-
-        envs = dict(self.environment_variables_base)
-        envs.update({"CONTAINER_NAME": codebuild.BuildEnvironmentVariable(value="python")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="software_not_running/python_issues")})
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="x86")})
-        build_software_not_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Python_x86_Build",
-            input=source_output,
-            project=build_python_x86_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="arm64")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="software_not_running/python_fixes")})
-        build_software_not_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Python_Fixes_arm64_Build",
-            input=source_output,
-            project=build_python_fixes_arm64_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-
-        build_nodejs_x86_project = codebuild.Project(self, "Nodejs_x86_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            )
-        )
-        build_nodejs_x86_project.add_to_role_policy(self.codecommit_policy)
-        build_nodejs_x86_project.add_to_role_policy(self.ecr_ops_policy)
-        build_nodejs_x86_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_nodejs_fixes_arm64_project = codebuild.Project(self, "Nodejs_Fixes_arm64_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_nodejs_fixes_arm64_project.add_to_role_policy(self.codecommit_policy)
-        build_nodejs_fixes_arm64_project.add_to_role_policy(self.ecr_ops_policy)
-        build_nodejs_fixes_arm64_project.add_to_role_policy(self.ecr_auth_policy)
-
-        envs = dict(self.environment_variables_base)
-        envs.update({"CONTAINER_NAME": codebuild.BuildEnvironmentVariable(value="nodejs")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="software_not_running/nodejs_issues")})
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="x86")})
-        build_software_not_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Nodejs_x86_Build",
-            input=source_output,
-            project=build_nodejs_x86_project,
-            environment_variables=envs,
-            run_order=2
-        ))
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="arm64")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="software_not_running/nodejs_fixes")})
-        build_software_not_running_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Nodejs_Fixes_arm64_Build",
-            input=source_output,
-            project=build_nodejs_fixes_arm64_project,
-            environment_variables=envs,
-            run_order=2
-        ))
-
-        # Runtime Tests
-        build_runtime_tests_stage = pipeline.add_stage(
-            placement=codepipeline.StagePlacement(
-                just_after=build_software_not_running_stage
-            ),
-            stage_name="Concept_3A_Runtime_Tests"
-        )
-
-        build_go_tests_x86_project = codebuild.Project(self, "Go_Tests_x86_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            )
-        )
-        build_go_tests_x86_project.add_to_role_policy(self.codecommit_policy)
-        build_go_tests_x86_project.add_to_role_policy(self.ecr_ops_policy)
-        build_go_tests_x86_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_go_tests_arm64_project = codebuild.Project(self, "Go_Tests_arm64_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
-            ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
-        )
-        build_go_tests_arm64_project.add_to_role_policy(self.codecommit_policy)
-        build_go_tests_arm64_project.add_to_role_policy(self.ecr_ops_policy)
-        build_go_tests_arm64_project.add_to_role_policy(self.ecr_auth_policy)
-
+        # Concept stages, generated from the workload table (arm64_demo/workloads.py)
+        self.projects = {}
+        self.project_ids = {}
+        self.artifacts = {}
+        if self.layout == "parallel":
+            # Wall-clock time of the longest build instead of the sum of the stages, only the multi-arch
+            # manifests and the performance report wait for the builds they depend on
+            stage = pipeline.add_stage(stage_name="Concepts_Parallel")
+            for _, items in STAGES:
+                for build in self.stage_builds(items):
+                    self.add_build_action(stage, build._replace(run_order=2 if build.dependent else 1))
+        else:
+            for stage_name, items in STAGES:
+                stage = pipeline.add_stage(stage_name=stage_name)
+                for build in self.stage_builds(items):
+                    self.add_build_action(stage, build)
+            if self.sweep:
+                stage = pipeline.add_stage(stage_name="Compute_Sweep")
+
+        # Sweep builds run concurrently, in the parallel stage or in a stage of their own after the concepts. Their
+        # artifacts are download-only, a report action couldn't take them all (at most 5 input artifacts per action)
+        for build in self.sweep_builds():
+            self.add_build_action(stage, build._replace(run_order=1))
+
+    def sweep_config(self, sweep):
+        # Context values given on the command line are strings
+        if not sweep:
+            return None
+        if isinstance(sweep, str):
+            sweep = json.loads(sweep)
+        def per_platform(values, default):
+            return values if isinstance(values, dict) else {platform: values or default for platform in PLATFORMS}
+
+        compute_types = per_platform(sweep.get("compute_types"), ["LARGE"])
+        # No image runs on both platforms, images are always given per platform
+        if sweep.get("images") and not isinstance(sweep["images"], dict):
+            raise ValueError("Sweep images must be given per platform, e.g. {\"x86\": [\"STANDARD_5_0\"]}")
+        images = sweep.get("images") or {}
+        config = {"platforms": sweep.get("platforms", list(PLATFORMS)), "workloads": sweep.get("workloads")}
+        for platform in config["platforms"]:
+            if platform not in PLATFORMS:
+                raise ValueError(f"Unknown platform '{platform}' in sweep, expected one of {PLATFORMS}")
+            config[platform] = {
+                "compute_types": compute_types.get(platform) or ["LARGE"],
+                "images": images.get(platform) or [DEFAULT_IMAGES[platform]],
+            }
+            for compute_type in config[platform]["compute_types"]:
+                if not hasattr(codebuild.ComputeType, compute_type):
+                    raise ValueError(f"Unknown compute type '{compute_type}' in sweep")
+            for image in config[platform]["images"]:
+                build_image(image, platform)
+        return config
+
+    def sweep_builds(self):
+        # The benchmark workloads of the table (or the ones named in the sweep) for every configuration
+        if not self.sweep:
+            return []
+        builds = []
+        for _, items in STAGES:
+            for item in items:
+                if not isinstance(item, Workload):
+                    continue
+                if not (item.name in self.sweep["workloads"] if self.sweep["workloads"] else item.benchmark):
+                    continue
+                for platform in self.sweep["platforms"]:
+                    for compute_type in self.sweep[platform]["compute_types"]:
+                        for image in self.sweep[platform]["images"]:
+                            builds.append(item.platform_build(platform, compute_type, image))
+        return builds
+
+    def stage_builds(self, items):
+        builds = []
+        for item in items:
+            builds.extend(item.builds() if isinstance(item, Workload) else [item])
+        return builds
+
+    def add_build_action(self, stage, build):
         envs = dict(self.environment_variables_base)
-        envs.update({"CONTAINER_NAME": codebuild.BuildEnvironmentVariable(value="go")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="runtime_tests/go_tests_issues")})
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="x86")})
-        build_runtime_tests_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Go_Tests_x86_Build",
-            input=source_output,
-            project=build_go_tests_x86_project,
+        for name, value in (build.environment or {}).items():
+            envs[name] = codebuild.BuildEnvironmentVariable(value=value)
+        stage.add_action(codepipeline_actions.CodeBuildAction(
+            action_name=build.name,
+            input=self.source_output,
+            extra_inputs=[self.artifact(name) for name in build.extra_inputs] or None,
+            outputs=[self.artifact(build.output)] if build.output else None,
+            project=self.build_project(build),
             environment_variables=envs,
-            run_order=1
+            run_order=build.run_order
         ))
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="arm64")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="runtime_tests/go_tests_fixed")})
-        build_runtime_tests_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="Go_Tests_Fixes_arm64_Build",
-            input=source_output,
-            project=build_go_tests_arm64_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-
-        # Performance Tests
-        build_perf_tests_stage = pipeline.add_stage(
-            placement=codepipeline.StagePlacement(
-                just_after=build_runtime_tests_stage
-            ),
-            stage_name="Concept_3B_Performance_Tests"
-        )
 
-        build_perf_tests_x86_project = codebuild.Project(self, "XGBoost_x86_Build",
+    def build_project(self, build):
+        # Projects are shared by all builds with the same build spec, platform, compute type and image
+        image = build.image or DEFAULT_IMAGES[build.platform]
+        key = (build.build_spec, build.platform, build.compute_type, image, build.docker, build.layer_cache, build.timeout_minutes)
+        if key in self.projects:
+            return self.projects[key]
+
+        spec_name = os.path.splitext(os.path.basename(build.build_spec))[0]
+        project_id = f"{spec_name}_{build.platform}_{build.compute_type}"
+        if image != DEFAULT_IMAGES[build.platform]:
+            project_id += f"_{image}"
+        # The construct ID names the CodeBuild project, builds which only differ in Docker, layer cache or timeout
+        # can't share it (a new ID renames, and so replaces, the project on deploy)
+        if project_id in self.project_ids:
+            raise ValueError(f"Builds {self.project_ids[project_id]} and {build.name} need different CodeBuild projects "
+                             f"but both map to {project_id}, give them different build specs or compute types")
+        self.project_ids[project_id] = build.name
+        project = codebuild.Project(self, project_id,
             source=codebuild.Source.code_commit(
                 repository=self.src_repository
             ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
+            build_spec=codebuild.BuildSpec.from_source_filename(build.build_spec),
             environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.STANDARD_4_0,
-                privileged=True
-            )
-        )
-        build_perf_tests_x86_project.add_to_role_policy(self.codecommit_policy)
-        build_perf_tests_x86_project.add_to_role_policy(self.ecr_ops_policy)
-        build_perf_tests_x86_project.add_to_role_policy(self.ecr_auth_policy)
-
-        build_perf_tests_arm64_project = codebuild.Project(self, "XGBoost_arm64_Build",
-            source=codebuild.Source.code_commit(
-                repository=self.src_repository
+                compute_type=getattr(codebuild.ComputeType, build.compute_type),
+                build_image=build_image(image, build.platform),
+                privileged=build.docker
             ),
-            build_spec=codebuild.BuildSpec.from_source_filename("native_build/native_build.yml"),
-            environment=codebuild.BuildEnvironment(
-                compute_type=codebuild.ComputeType.LARGE,
-                build_image=codebuild.LinuxBuildImage.AMAZON_LINUX_2_ARM_2,
-                privileged=True
-            )
+            cache=self.native_build_cache if build.layer_cache else codebuild.Cache.none(),
+            timeout=Duration.minutes(build.timeout_minutes) if build.timeout_minutes else None
         )
-        build_perf_tests_arm64_project.add_to_role_policy(self.codecommit_policy)
-        build_perf_tests_arm64_project.add_to_role_policy(self.ecr_ops_policy)
-        build_perf_tests_arm64_project.add_to_role_policy(self.ecr_auth_policy)
-
-        envs = dict(self.environment_variables_base)
-        envs.update({"CONTAINER_NAME": codebuild.BuildEnvironmentVariable(value="xgboost")})
-        envs.update({"FILES_LOCATION": codebuild.BuildEnvironmentVariable(value="perf_tests")})
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="x86")})
-        build_perf_tests_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="XGBoost_Perf_x86_Build",
-            input=source_output,
-            project=build_perf_tests_x86_project,
-            environment_variables=envs,
-            run_order=1
-        ))
-        envs.update({"PLATFORM": codebuild.BuildEnvironmentVariable(value="arm64")})
-        build_perf_tests_stage.add_action(codepipeline_actions.CodeBuildAction(
-            action_name="XGBoost_Perf_arm64_Build",
-            input=source_output,
-            project=build_perf_tests_arm64_project,
-            environment_variables=envs,
-            run_order=1
-        ))
+        project.add_to_role_policy(self.codecommit_policy)
+        if build.docker:
+            project.add_to_role_policy(self.ecr_ops_policy)
+            project.add_to_role_policy(self.ecr_auth_policy)
+        self.projects[key] = project
+        return project
+
+    def artifact(self, name):
+        if name not in self.artifacts:
+            self.artifacts[name] = codepipeline.Artifact(name)
+        return self.artifacts[name]
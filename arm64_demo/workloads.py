@@ -0,0 +1,113 @@
+from typing import NamedTuple, Optional, Tuple
+
+NATIVE_BUILD_SPEC = "native_build/native_build.yml"
+MULTI_ARCH_BUILD_SPEC = "native_build/native_build_multi_arch.yml"
+
+# Platforms of the native builds, the value is the PLATFORM suffix of the image tags
+PLATFORMS = ("x86", "arm64")
+# CodeBuild image of each platform (attribute name of LinuxBuildImage or LinuxArmBuildImage)
+DEFAULT_IMAGES = {"x86": "STANDARD_4_0", "arm64": "AMAZON_LINUX_2_ARM_2"}
+
+
+class Build(NamedTuple):
+    # One CodeBuild action, the project is shared by all builds with the same spec, platform and compute type
+    name: str
+    build_spec: str
+    platform: str
+    run_order: int = 1
+    compute_type: str = "LARGE"
+    # None: DEFAULT_IMAGES of the platform
+    image: Optional[str] = None
+    docker: bool = True
+    # Native image builds (docker_build.sh) use the Docker layer cache in the cached build mode
+    layer_cache: bool = False
+    timeout_minutes: Optional[int] = None
+    # Needs the images or artifacts of the other builds of its stage, runs after them in the parallel layout
+    dependent: bool = False
+    environment: Optional[dict] = None
+    extra_inputs: Tuple[str, ...] = ()
+    output: Optional[str] = None
+
+
+class Workload(NamedTuple):
+    # A container image built natively on each platform in `paths` (platform -> directory in the repo),
+    # optionally followed by a multi-arch manifest of the platform images
+    name: str
+    container: str
+    paths: dict
+    multi_arch: bool = False
+    run_order: int = 1
+    build_spec: str = NATIVE_BUILD_SPEC
+    # Artifact name prefix, each platform build outputs <results>_<platform>
+    results: Optional[str] = None
+    # Part of the compute sweep (build and performance test times per compute type and image)
+    benchmark: bool = False
+
+    def platform_build(self, platform, compute_type=None, image=None):
+        # A sweep build names its configuration (BUILD_CONFIG) in the action, image tag and results artifact
+        config = f"{compute_type}-{image}" if compute_type else None
+        suffix = f"_{platform}_{config}" if config else f"_{platform}"
+        environment = {
+            "CONTAINER_NAME": f"{self.container}-{config.lower()}" if config else self.container,
+            "FILES_LOCATION": self.paths[platform],
+            "PLATFORM": platform,
+        }
+        if config:
+            environment["BUILD_CONFIG"] = config
+        return Build(
+            f"{self.name}{suffix}_Build", self.build_spec, platform, run_order=self.run_order,
+            compute_type=compute_type or "LARGE", image=image, layer_cache=True, environment=environment,
+            output=f"{self.results}{suffix}" if self.results else None
+        )
+
+    def builds(self):
+        builds = [self.platform_build(platform) for platform in self.paths]
+        if self.multi_arch:
+            builds.append(Build(
+                f"{self.name}_Multi_Arch_Build", MULTI_ARCH_BUILD_SPEC, "arm64", run_order=self.run_order + 1,
+                dependent=True, environment={"CONTAINER_NAME": self.container}
+            ))
+        return builds
+
+
+def same_path(path):
+    return {platform: path for platform in PLATFORMS}
+
+
+# Pipeline stages in order, a new workload is one more row. In the parallel layout all builds share one
+# stage and only the dependent builds wait for the others
+STAGES = (
+    ("Concept_1A_Build_Speed_Native", (
+        Workload("Native_Speed", "compute_bound_native", same_path("native_speed"), multi_arch=True,
+                 build_spec="native_speed/native_speed_build.yml", results="BuildProfile", benchmark=True),
+    )),
+    ("Concept_1B_Build_Speed_Emulated", (
+        # Room for the two extra emulated builds of the layout benchmark (LAYOUT_BENCHMARK in emulated_speed.yml)
+        Build("Emulated_Speed_Multi-Arch_Build", "emulated_speed/emulated_speed.yml", "x86", timeout_minutes=180,
+              output="BuildProfile_emulated"),
+    )),
+    ("Concept_1C_Build_Speed_Cross", (
+        Build("Cross_Speed_Build", "cross_speed/cross_speed.yml", "x86", output="BuildProfile_cross"),
+        Build("Build_Profile_Report", "native_build/build_profile.yml", "arm64", run_order=2, compute_type="SMALL",
+              docker=False, dependent=True, output="BuildProfileReport",
+              extra_inputs=("BuildProfile_x86", "BuildProfile_arm64", "BuildProfile_emulated", "BuildProfile_cross")),
+    )),
+    ("Concept_2A_Software_Running", (
+        Workload("Software_Running", "software_running", same_path("software_running"), multi_arch=True),
+    )),
+    ("Concept_2B_Software_Not_Running", (
+        Workload("Python", "python", {"x86": "software_not_running/python_issues",
+                                      "arm64": "software_not_running/python_fixes"}),
+        Workload("Nodejs", "nodejs", {"x86": "software_not_running/nodejs_issues",
+                                      "arm64": "software_not_running/nodejs_fixes"}, run_order=2),
+    )),
+    ("Concept_3A_Runtime_Tests", (
+        Workload("Go_Tests", "go", {"x86": "runtime_tests/go_tests_issues", "arm64": "runtime_tests/go_tests_fixed"}),
+    )),
+    ("Concept_3B_Performance_Tests", (
+        Workload("XGBoost_Perf", "xgboost", same_path("perf_tests"), build_spec="perf_tests/perf_build.yml",
+                 results="PerfResults", benchmark=True),
+        Build("XGBoost_Perf_Report", "perf_tests/perf_report.yml", "arm64", run_order=2, compute_type="SMALL",
+              docker=False, dependent=True, extra_inputs=("PerfResults_x86", "PerfResults_arm64"), output="PerfReport"),
+    )),
+)
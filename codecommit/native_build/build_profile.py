@@ -0,0 +1,239 @@
+# Per-step timings of Docker builds from the BuildKit progress in rawjson form
+#
+# docker buildx build --progress=rawjson writes one JSON status update per line: vertexes (the build steps,
+# updated when they start and when they complete, cached when the layer came from the cache), statuses and
+# base64 encoded log output. The updates of each step are merged into its duration and cache hit, and the
+# steps of several builds (native x86, native arm64, emulated arm64) are compared side by side. Steps are
+# matched by stage and instruction rather than by number, the Dockerfiles of the native and emulated builds
+# don't order their steps the same way. Each build is labelled with its file name, without the extension:
+#
+#   python3 build_profile.py --reference native-arm64 fixtures/native-x86.jsonl fixtures/native-arm64.jsonl fixtures/emulated-arm64.jsonl
+#
+# --failures only prints the failed steps with the end of their log and the messages of the docker CLI, for a
+# build whose progress went to a file: docker buildx build ... 2> build.jsonl || build_profile.py --failures build.jsonl
+
+import os
+import re
+import json
+import base64
+import argparse
+import collections
+from datetime import datetime
+
+# "[builder  3/15] RUN ...", "[linux/arm64 builder  3/15] RUN ..." (build for another platform), "[2/5] COPY ..."
+STEP_NAME = re.compile(r"^\[(?:\S+/\S+ )?(?:(\S+)\s+)?(\d+)/(\d+)\]\s+(.*)$", re.DOTALL)
+TIMESTAMP = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)$")
+CLONED_REPO = re.compile(r"git clone\s.*?\S+://\S+/([^/\s]+?)(?:\.git)?(?=\s|$)")
+# Log lines kept for a failed step
+LOG_TAIL_LINES = 20
+
+
+def field(obj, name):
+    # rawjson keys are lower case, the Go field names of BuildKit's SolveStatus are accepted as well
+    return obj.get(name, obj.get(name.capitalize()))
+
+
+def parse_time(value):
+    # RFC 3339 with nanoseconds (2023-06-01T10:00:01.123456789Z), datetime only takes microseconds
+    if not value:
+        return None
+    match = TIMESTAMP.match(value)
+    if not match:
+        raise ValueError("Unexpected timestamp '%s'" % value)
+    seconds, fraction, zone = match.groups()
+    fraction = (fraction or "")[:6].ljust(6, "0")
+    return datetime.fromisoformat("%s.%s%s" % (seconds, fraction, "+00:00" if zone == "Z" else zone)).timestamp()
+
+
+def describe(name):
+    # Stage, step number and instruction of a vertex name, internal vertices ("[internal] load metadata ...",
+    # "exporting to image") have no stage
+    match = STEP_NAME.match(name)
+    if not match:
+        return {"stage": "", "number": None, "instruction": name, "key": name, "label": name}
+    stage, number, _, instruction = match.groups()
+    instruction = " ".join(instruction.split())
+    # The base image is resolved to a different digest per platform, and cache mounts of a RUN step don't change
+    # what it runs
+    key_instruction = re.sub(r"@sha256:[0-9a-f]+|--mount=\S+ ", "", instruction)
+    repo = CLONED_REPO.search(instruction)
+    if repo:
+        label = "%s %s" % (instruction.split()[0], repo.group(1))
+    else:
+        label = key_instruction.replace("set -e && ", "")
+        label = label if len(label) <= 60 else label[:57] + "..."
+    return {"stage": stage or "", "number": int(number), "instruction": instruction,
+            "key": "%s|%s" % (stage or "", key_instruction), "label": label}
+
+
+def parse_log(lines):
+    # Steps in the order they first appeared, the updates of a vertex are merged by its digest
+    vertices = {}
+    logs = {}
+    messages = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        # The docker CLI writes its own messages (warnings, the final error) to the same stream, lines starting
+        # with # are comments (the header of the sample logs)
+        if not line.startswith("{"):
+            if line and not line.startswith("#"):
+                messages.append(line)
+            continue
+        try:
+            update = json.loads(line)
+        except ValueError:
+            raise ValueError("Line %d is not a BuildKit rawjson status update" % number)
+        for vertex in field(update, "vertexes") or []:
+            step = vertices.setdefault(field(vertex, "digest"), {
+                "name": field(vertex, "name"), "started": None, "completed": None, "cached": False, "error": None,
+            })
+            started, completed = parse_time(field(vertex, "started")), parse_time(field(vertex, "completed"))
+            if started is not None and (step["started"] is None or started < step["started"]):
+                step["started"] = started
+            if completed is not None and (step["completed"] is None or completed > step["completed"]):
+                step["completed"] = completed
+            step["cached"] = step["cached"] or bool(field(vertex, "cached"))
+            step["error"] = field(vertex, "error") or step["error"]
+        for log in field(update, "logs") or []:
+            tail = logs.setdefault(field(log, "vertex"), collections.deque(maxlen=LOG_TAIL_LINES))
+            tail.extend(base64.b64decode(field(log, "data") or "").decode("utf-8", "replace").splitlines())
+
+    steps = []
+    for digest, vertex in vertices.items():
+        step = describe(vertex["name"])
+        step["duration_s"] = (vertex["completed"] - vertex["started"]
+                              if vertex["started"] is not None and vertex["completed"] is not None else None)
+        step["cached"] = vertex["cached"]
+        step["error"] = vertex["error"]
+        if vertex["error"]:
+            step["log_tail"] = list(logs.get(digest, []))
+        steps.append(step)
+    started = [vertex["started"] for vertex in vertices.values() if vertex["started"] is not None]
+    completed = [vertex["completed"] for vertex in vertices.values() if vertex["completed"] is not None]
+    return steps, (max(completed) - min(started) if started and completed else None), messages
+
+
+def read_profile(path):
+    with open(path) as f:
+        steps, total_s, messages = parse_log(f)
+    return {
+        "build": os.path.splitext(os.path.basename(path))[0],
+        "path": path,
+        "total_s": total_s,
+        "steps": steps,
+        "cached_steps": sum(step["cached"] for step in steps if step["number"] is not None),
+        "dockerfile_steps": sum(step["number"] is not None for step in steps),
+        "errors": [step for step in steps if step["error"]],
+        "messages": messages,
+    }
+
+
+def compare(profiles, reference):
+    # One row per step of any build, the ratio is the duration relative to the reference build (> 1: slower)
+    rows = {}
+    for profile in profiles:
+        for step in profile["steps"]:
+            row = rows.setdefault(step["key"], {
+                "stage": step["stage"], "label": step["label"], "instruction": step["instruction"], "builds": {},
+            })
+            row["builds"][profile["build"]] = {
+                "duration_s": step["duration_s"],
+                "share": step["duration_s"] / profile["total_s"] if step["duration_s"] and profile["total_s"] else None,
+                "cached": step["cached"],
+                "error": step["error"],
+            }
+    for row in rows.values():
+        base = row["builds"].get(reference, {}).get("duration_s")
+        for values in row["builds"].values():
+            values["ratio"] = values["duration_s"] / base if base and values["duration_s"] is not None else None
+    return list(rows.values())
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    return "%dm%02ds" % divmod(round(seconds), 60) if seconds >= 60 else "%.1fs" % seconds
+
+
+def format_step(values):
+    if not values:
+        return "-"
+    if values["error"]:
+        return "ERROR"
+    if values["cached"]:
+        return "CACHED"
+    return format_duration(values["duration_s"])
+
+
+def markdown_report(profiles, rows, reference):
+    builds = [profile["build"] for profile in profiles]
+    others = [build for build in builds if build != reference] if len(builds) > 1 else []
+    lines = ["# Build steps (reference: %s)" % reference, ""]
+    header = ["Stage", "Step"] + builds + ["%s vs %s" % (build, reference) for build in others]
+    lines.append("| " + " | ".join(header) + " |")
+    lines.append("|" + "|".join(" --- " for _ in header) + "|")
+    for row in rows:
+        cells = [row["stage"], row["label"]]
+        cells += [format_step(row["builds"].get(build)) for build in builds]
+        cells += ["%.2fx" % row["builds"][build]["ratio"] if row["builds"].get(build, {}).get("ratio") else "-"
+                  for build in others]
+        lines.append("| " + " | ".join(cells) + " |")
+    totals = {profile["build"]: profile["total_s"] for profile in profiles}
+    cells = ["", "**Total**"] + ["**%s**" % format_duration(totals[build]) for build in builds]
+    cells += ["**%.2fx**" % (totals[build] / totals[reference]) if totals[build] and totals.get(reference) else "-"
+              for build in others]
+    lines.append("| " + " | ".join(cells) + " |")
+    lines.append("")
+    for profile in profiles:
+        lines.append("- %s: %s, %d of %d Dockerfile steps cached" % (
+            profile["build"], format_duration(profile["total_s"]), profile["cached_steps"], profile["dockerfile_steps"]))
+        lines.extend(failure_lines(profile))
+    return "\n".join(lines) + "\n"
+
+
+def failure_lines(profile):
+    # Failed steps with the last LOG_TAIL_LINES lines of their output (e.g. the compiler error)
+    lines = []
+    for step in profile["errors"]:
+        lines.append("  - failed: %s %s: %s" % (step["stage"], step["label"], step["error"]))
+        lines.extend("        " + line for line in step.get("log_tail", []))
+    return lines
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-step durations and cache hits of Docker builds (BuildKit rawjson progress)")
+    parser.add_argument("logs", nargs="+", help="progress logs of docker buildx build --progress=rawjson, labelled by file name")
+    parser.add_argument("--reference", default=None, help="build the others are compared with (default: the first log)")
+    parser.add_argument("--output", default=None, help="write the Markdown report to this file")
+    parser.add_argument("--json", default=None, help="write the steps and the comparison as JSON to this file")
+    parser.add_argument("--failures", action="store_true", help="only print the failed steps and the docker CLI messages of each log")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    profiles = [read_profile(path) for path in args.logs]
+    if args.failures:
+        for profile in profiles:
+            print("Build %s: %d failed step(s)" % (profile["build"], len(profile["errors"])))
+            print("\n".join(failure_lines(profile) + profile["messages"]))
+        return
+
+    reference = args.reference or profiles[0]["build"]
+    if reference not in [profile["build"] for profile in profiles]:
+        raise SystemExit("Unknown reference build '%s'" % reference)
+
+    rows = compare(profiles, reference)
+    report = markdown_report(profiles, rows, reference)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"reference": reference, "builds": profiles, "steps": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/bin/bash
+# Builds $ECR_REPO_NAME:$CONTAINER_NAME-$PLATFORM from the Dockerfile in the current directory
+#
+# BUILD_CACHE=cold (default): every layer is rebuilt (--no-cache). Where the directory has a Dockerfile.serial
+# (native_speed), that one is built with the classic builder, which is how the build times shown by the demo were
+# measured. The other Dockerfiles need BuildKit for their cache mounts and parallel stages
+# BUILD_CACHE=cached: one buildx build (native_build/install_buildx.sh) on a docker-container builder, which
+# reads and writes the registry cache image <container>-<platform>-cache in ECR. mode=max exports the layers
+# of every stage (e.g. the dependency stages of native_speed), not only the ones of the final image, so
+# BuildKit builds the stages concurrently and only rebuilds what changed. Pip wheels are kept per
+# architecture in a BuildKit cache mount.
+#
+# BUILD_ID is passed as a build argument, Dockerfiles declare it before the steps which run tests or
+# benchmarks so those never come from the cache. BUILD_CONFIG (compute type and image of a compute sweep
+# build) is passed on as well, the performance tests record it in their results. SCALING_SIZES (dataset sizes
+# of the performance tests' scaling ladder) is passed on when it's set and not empty
+#
+# BUILD_PROFILE=<file>: the final build runs through buildx (native_build/install_buildx.sh) and writes the
+# BuildKit progress in rawjson form to <file> instead of the plain log, build_profile.py turns it into the
+# duration and cache hit of every step. A failed build prints its failed steps with the end of their output.
+# The classic builder has no such progress: a cold build of Dockerfile.serial is followed by a profiled cold
+# build of the Dockerfile, the time of the first one is printed on its own
+
+set -euo pipefail
+
+export DOCKER_BUILDKIT=1
+REGISTRY=$AWS_ACCOUNT_ID.dkr.ecr.$AWS_REGION.amazonaws.com
+IMAGE=$ECR_REPO_NAME:$CONTAINER_NAME-$PLATFORM
+BUILD_ID=${CODEBUILD_BUILD_ID:-$(date +%s)}
+BUILD_ARGS=(--build-arg BUILD_ID=$BUILD_ID --build-arg BUILD_CONFIG=${BUILD_CONFIG:-})
+if [ -n "${SCALING_SIZES:-}" ]; then
+    BUILD_ARGS+=(--build-arg "SCALING_SIZES=$SCALING_SIZES")
+fi
+
+final_build() {
+    if [ -n "${BUILD_PROFILE:-}" ]; then
+        docker buildx build --load --progress=rawjson "$@" 2> "$BUILD_PROFILE" || {
+            python3 "$(dirname "$0")/build_profile.py" --failures "$BUILD_PROFILE"; return 1; }
+    elif [ "${BUILD_CACHE:-cold}" = "cached" ]; then
+        docker buildx build --load "$@"
+    else
+        docker build "$@"
+    fi
+}
+
+if [ "${BUILD_CACHE:-cold}" != "cached" ]; then
+    if [ -f Dockerfile.serial ]; then
+        echo "Cold build (no cache, classic builder, Dockerfile.serial)"
+        time DOCKER_BUILDKIT=0 docker build --no-cache -f Dockerfile.serial "${BUILD_ARGS[@]}" -t $IMAGE .
+        if [ -z "${BUILD_PROFILE:-}" ]; then
+            exit 0
+        fi
+        echo "Profiled cold build of the Dockerfile (BuildKit)"
+    else
+        echo "Cold build (no cache)"
+    fi
+    final_build --no-cache "${BUILD_ARGS[@]}" -t $IMAGE .
+    exit 0
+fi
+
+echo "Cached build (registry cache in ECR)"
+# The default docker driver of buildx can't export a registry cache. ECR stores the cache as an image manifest
+# (image-manifest=true), not as the manifest list BuildKit writes by default
+CACHE_IMAGE=$REGISTRY/$ECR_REPO_NAME:$CONTAINER_NAME-$PLATFORM-cache
+docker buildx create --name registry-cache --driver docker-container --use 2> /dev/null || docker buildx use registry-cache
+final_build --cache-from type=registry,ref=$CACHE_IMAGE \
+    --cache-to type=registry,ref=$CACHE_IMAGE,mode=max,image-manifest=true,oci-mediatypes=true \
+    "${BUILD_ARGS[@]}" -t $IMAGE .
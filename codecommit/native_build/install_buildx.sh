@@ -0,0 +1,17 @@
+#!/bin/bash
+# Installs the Docker buildx plugin for the architecture of the host, the CodeBuild images don't ship a version
+# which supports --progress=rawjson (buildx v0.13 or later, used to profile the build steps)
+
+set -euo pipefail
+
+BUILDX_VERSION=${BUILDX_VERSION:-v0.13.1}
+case $(uname -m) in
+    x86_64) ARCH=amd64 ;;
+    aarch64) ARCH=arm64 ;;
+    *) echo "Unsupported architecture $(uname -m)"; exit 1 ;;
+esac
+
+mkdir -p ~/.docker/cli-plugins
+wget -q https://github.com/docker/buildx/releases/download/$BUILDX_VERSION/buildx-$BUILDX_VERSION.linux-$ARCH -O ~/.docker/cli-plugins/docker-buildx
+chmod +x ~/.docker/cli-plugins/docker-buildx
+docker buildx version
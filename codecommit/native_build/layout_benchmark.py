@@ -0,0 +1,91 @@
+# Serial vs parallel layout of a multi-stage Dockerfile: cold build time per platform
+#
+# Builds Dockerfile.serial (one dependency after another) and Dockerfile (independent dependencies in parallel
+# BuildKit stages, all cores per build) without cache for every platform, natively or under emulation when the
+# platform isn't the one of the host, and reports the wall time of each build with the speedup of the parallel
+# layout. The BuildKit progress of every build is kept in rawjson form to compare its steps with
+# build_profile.py. Run from the directory of the Dockerfiles:
+#
+#   python3 ../native_build/layout_benchmark.py --platforms linux/amd64 linux/arm64
+
+import os
+import json
+import time
+import argparse
+import platform
+import subprocess
+import build_profile
+
+# Platform of the host, the labels use the PLATFORM names of the pipeline (x86, arm64)
+MACHINES = {"x86_64": "linux/amd64", "aarch64": "linux/arm64"}
+PLATFORM_NAMES = {"linux/amd64": "x86", "linux/arm64": "arm64"}
+
+
+def platform_label(target):
+    host = MACHINES.get(platform.machine())
+    return "%s-%s" % ("native" if target == host else "emulated", PLATFORM_NAMES.get(target, target.replace("/", "-")))
+
+
+def run_build(dockerfile, target, context, profile_path):
+    command = ["docker", "buildx", "build", "--platform", target, "--no-cache", "--load", "--progress=rawjson",
+               "-f", dockerfile, "-t", "layout-benchmark", context]
+    start = time.perf_counter()
+    with open(profile_path, "w") as log:
+        result = subprocess.run(command, stderr=log)
+    wall_s = time.perf_counter() - start
+    if result.returncode != 0:
+        profile = build_profile.read_profile(profile_path)
+        print(build_profile.markdown_report([profile], build_profile.compare([profile], profile["build"]), profile["build"]))
+        raise SystemExit("Build of %s for %s failed" % (dockerfile, target))
+    return wall_s
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cold build time of the serial and the parallel Dockerfile per platform")
+    parser.add_argument("--platforms", nargs="+", default=[MACHINES.get(platform.machine(), "linux/amd64")],
+                        help="target platforms, the ones which aren't the platform of the host are emulated (default: host)")
+    parser.add_argument("--serial", default="Dockerfile.serial", help="Dockerfile building one dependency after another")
+    parser.add_argument("--parallel", default="Dockerfile", help="Dockerfile building independent dependencies in parallel stages")
+    parser.add_argument("--context", default=".", help="build context")
+    parser.add_argument("--profile-dir", default="layout_profiles", help="directory of the rawjson progress of every build")
+    parser.add_argument("--output", default=None, help="JSON result file (default: <profile-dir>/layout-benchmark.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.profile_dir, exist_ok=True)
+
+    builds = []
+    for target in args.platforms:
+        label = platform_label(target)
+        for layout, dockerfile in (("serial", args.serial), ("parallel", args.parallel)):
+            print("Building %s for %s (%s layout)" % (dockerfile, target, layout), flush=True)
+            profile_path = os.path.join(args.profile_dir, "%s-%s.jsonl" % (layout, label))
+            wall_s = run_build(dockerfile, target, args.context, profile_path)
+            profile = build_profile.read_profile(profile_path)
+            builds.append({"platform": target, "label": label, "layout": layout, "dockerfile": dockerfile,
+                           "wall_s": wall_s, "build_s": profile["total_s"], "profile": profile_path})
+            print("%s %s: %s" % (label, layout, build_profile.format_duration(wall_s)), flush=True)
+
+    summary = {}
+    for build in builds:
+        summary.setdefault(build["label"], {})["%s_s" % build["layout"]] = build["wall_s"]
+    for values in summary.values():
+        values["speedup"] = values["serial_s"] / values["parallel_s"]
+
+    print("\n\n")
+    print("%-16s %10s %10s %9s" % ("platform", "serial", "parallel", "speedup"))
+    for label, values in summary.items():
+        print("%-16s %10s %10s %8.2fx" % (label, build_profile.format_duration(values["serial_s"]),
+                                          build_profile.format_duration(values["parallel_s"]), values["speedup"]))
+    print("\n\n")
+
+    output = args.output or os.path.join(args.profile_dir, "layout-benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"host": platform.machine(), "cpu_count": os.cpu_count(), "builds": builds, "platforms": summary}, f, indent=2)
+    print("Results written to %s" % output)
+
+
+if __name__ == "__main__":
+    main()
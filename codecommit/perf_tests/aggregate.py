@@ -0,0 +1,132 @@
+# Merges the JSON results of the x86 and arm64 runs into one comparison report
+#
+# For every workload and phase the median time of each architecture is compared with the reference
+# architecture: speedup > 1 means faster than the reference, price-performance > 1 means cheaper per run
+# (median time x hourly price in prices.json of the instance comparable to the CodeBuild compute type of the run,
+# LARGE unless the run is part of a compute sweep)
+
+import json
+import argparse
+import benchmark
+
+# Compute type of the CodeBuild projects outside a compute sweep
+DEFAULT_COMPUTE_TYPE = "LARGE"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cross-architecture comparison of performance test results")
+    parser.add_argument("results", nargs="+", help="JSON result files written by classify.py (or the other perf tests)")
+    parser.add_argument("--prices", default="prices.json", help="hourly price per architecture and compute type")
+    parser.add_argument("--reference", default="x86_64", help="architecture the others are compared with")
+    parser.add_argument("--output", default=None, help="write the Markdown report to this file")
+    parser.add_argument("--json", default=None, help="write the comparison as JSON to this file")
+    return parser.parse_args()
+
+
+def architecture_label(result):
+    # Compute sweep results are compared per configuration, e.g. "aarch64 LARGE-AMAZON_LINUX_2_ARM_2"
+    environment = result["environment"]
+    if environment.get("build_config"):
+        return "%s %s" % (environment["architecture"], environment["build_config"])
+    return environment["architecture"]
+
+
+def host_price(result, prices):
+    # Instance and hourly price of the host of a run, by architecture and the compute type of its build_config
+    # (e.g. "MEDIUM-STANDARD_5_0"), runs outside a compute sweep are priced as the default LARGE compute type
+    environment = result["environment"]
+    compute_type = (environment.get("build_config") or DEFAULT_COMPUTE_TYPE).split("-", 1)[0]
+    return prices.get(environment["architecture"], {}).get(compute_type)
+
+
+def latest_results(results):
+    # (workload, architecture label) -> result, the most recent run wins when there are several
+    latest = {}
+    for result in sorted(results, key=lambda result: result.get("timestamp", "")):
+        latest[(result["workload"], architecture_label(result))] = result
+    return latest
+
+
+def compare(results, prices, reference="x86_64"):
+    latest = latest_results(results)
+    architectures = sorted({architecture for _, architecture in latest}, key=lambda a: (a != reference, a))
+    hosts = {}
+    rows = []
+    for workload in sorted({workload for workload, _ in latest}):
+        runs = {a: latest[(workload, a)] for a in architectures if (workload, a) in latest}
+        phases = []
+        for run in runs.values():
+            phases.extend(phase for phase in run["phases"] if phase not in phases)
+        for phase in phases:
+            row = {"workload": workload, "phase": phase, "architectures": {}}
+            for architecture, run in runs.items():
+                if phase not in run["phases"]:
+                    continue
+                median_s = run["phases"][phase]["median_s"]
+                hosts[architecture] = host_price(run, prices)
+                price = (hosts[architecture] or {}).get("usd_per_hour")
+                row["architectures"][architecture] = {
+                    "median_s": median_s,
+                    "p95_s": run["phases"][phase].get("p95_s"),
+                    "cost_usd": median_s * price / 3600 if price else None,
+                }
+            base = row["architectures"].get(reference)
+            for architecture, values in row["architectures"].items():
+                values["speedup"] = base["median_s"] / values["median_s"] if base and values["median_s"] else None
+                values["price_performance"] = (base["cost_usd"] / values["cost_usd"]
+                                               if base and base["cost_usd"] and values["cost_usd"] else None)
+            rows.append(row)
+    return architectures, rows, hosts
+
+
+def format_value(value, pattern):
+    return pattern % value if value is not None else "-"
+
+
+def markdown_report(architectures, rows, hosts, reference):
+    lines = ["# Performance comparison (reference: %s)" % reference, ""]
+    header = ["Workload", "Phase"]
+    for architecture in architectures:
+        header += ["%s median" % architecture, "%s p95" % architecture]
+    for architecture in architectures:
+        if architecture != reference:
+            header += ["%s speedup" % architecture, "%s price-performance" % architecture]
+    lines.append("| " + " | ".join(header) + " |")
+    lines.append("|" + "|".join(" --- " for _ in header) + "|")
+    for row in rows:
+        cells = [row["workload"], row["phase"]]
+        for architecture in architectures:
+            values = row["architectures"].get(architecture, {})
+            cells += [format_value(values.get("median_s"), "%.5fs"), format_value(values.get("p95_s"), "%.5fs")]
+        for architecture in architectures:
+            if architecture != reference:
+                values = row["architectures"].get(architecture, {})
+                cells += [format_value(values.get("speedup"), "%.2fx"), format_value(values.get("price_performance"), "%.2fx")]
+        lines.append("| " + " | ".join(cells) + " |")
+    lines.append("")
+    for architecture in architectures:
+        host = hosts.get(architecture)
+        if host:
+            lines.append("- %s priced as %s at $%s/hour" % (architecture, host.get("instance", "?"), host["usd_per_hour"]))
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    args = parse_args()
+    with open(args.prices) as f:
+        prices = json.load(f)
+
+    architectures, rows, hosts = compare(benchmark.read_results(args.results), prices, args.reference)
+    report = markdown_report(architectures, rows, hosts, args.reference)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"reference": args.reference, "architectures": architectures, "hosts": hosts, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
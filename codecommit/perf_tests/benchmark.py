@@ -0,0 +1,188 @@
+# Repeated timing measurements and machine-readable results for the performance tests
+#
+# Single-shot timings can't separate architecture differences from noise, so each phase is run
+# with warm-up iterations followed by N measured repetitions and summarized as median/p95/stddev
+
+import os
+import sys
+import json
+import time
+import socket
+import resource
+import contextlib
+import tracemalloc
+import platform
+import statistics
+from datetime import datetime, timezone
+from importlib import metadata
+import profiling
+
+LIBRARIES = ("numpy", "pandas", "xgboost", "scikit-learn", "imbalanced-learn", "treelite")
+
+
+def measure(fn, warmup=1, repeat=5):
+    # Returns the duration of each measured repetition in nanoseconds, warm-up runs are discarded
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def percentile(values, pct):
+    # Linear interpolation between closest ranks (same as numpy's default)
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(samples_ns):
+    seconds = [sample / 1e9 for sample in samples_ns]
+    return {
+        "repeat": len(seconds),
+        "median_s": statistics.median(seconds),
+        "p95_s": percentile(seconds, 95),
+        "p99_s": percentile(seconds, 99),
+        "stddev_s": statistics.stdev(seconds) if len(seconds) > 1 else 0.0,
+        "mean_s": statistics.mean(seconds),
+        "min_s": min(seconds),
+        "max_s": max(seconds),
+        "samples_s": seconds,
+    }
+
+
+def peak_rss_mb():
+    # High-water mark of the resident set size of this process so far (ru_maxrss is in KiB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+@contextlib.contextmanager
+def trace_memory(stats):
+    # tracemalloc sees the buffers of numpy/pandas, not memory allocated inside XGBoost's C++ code.
+    # clear_traces() also resets the peak (reset_peak() needs Python 3.9). Tracing slows every allocation down,
+    # it is stopped on exit unless it was already on
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.clear_traces()
+    try:
+        yield stats
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    # Only the blocks allocated in the block and not freed by its end are left in the snapshot
+    stats["traced_peak_mb"] = peak / 2**20
+    stats["retained_mb"] = current / 2**20
+    stats["retained_blocks"] = sum(stat.count for stat in snapshot.statistics("filename"))
+
+
+def print_memory(name, stats):
+    print("%s --- traced peak %.1f MB, %.1f MB in %d blocks allocated and still live at the end ---"
+          % (name, stats["traced_peak_mb"], stats["retained_mb"], stats["retained_blocks"]))
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                # "model name" on x86, arm64 kernels only expose "CPU part" (e.g. 0xd0c = Neoverse N1)
+                if line.startswith(("model name", "CPU part")):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown"
+
+
+def read_sysfs(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def cache_sizes():
+    # Data and unified CPU caches of the first core in bytes, e.g. {"L1d": 65536, "L2": 1048576, "L3": 33554432}
+    root = "/sys/devices/system/cpu/cpu0/cache"
+    units = {"K": 1024, "M": 1024 * 1024}
+    sizes = {}
+    for index in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        try:
+            level, kind, size = (read_sysfs(os.path.join(root, index, name)) for name in ("level", "type", "size"))
+        except OSError:
+            continue
+        if kind != "Instruction" and size:
+            sizes["L%s%s" % (level, "d" if kind == "Data" else "")] = int(size.rstrip("KM")) * units.get(size[-1], 1)
+    return sizes
+
+
+def library_versions(libraries=LIBRARIES):
+    versions = {}
+    for library in libraries:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+
+def environment_info():
+    return {
+        "architecture": platform.machine(),
+        "cpu_model": cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "cpu_count_available": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "libraries": library_versions(),
+        # CodeBuild compute type and image of a compute sweep build (docker build argument), e.g. LARGE-STANDARD_4_0
+        "build_config": os.environ.get("BUILD_CONFIG") or None,
+    }
+
+
+def scaling_steps(max_count=None):
+    # 1, 2, 4, ... up to max_count (default: available cores), max_count itself is always included
+    max_count = max_count or environment_info()["cpu_count_available"]
+    steps = []
+    count = 1
+    while count < max_count:
+        steps.append(count)
+        count *= 2
+    steps.append(max_count)
+    return steps
+
+
+def print_summary(name, summary):
+    print("%s --- median %.5fs, p95 %.5fs, stddev %.5fs (%d runs) ---"
+          % (name, summary["median_s"], summary["p95_s"], summary["stddev_s"], summary["repeat"]))
+
+
+def write_result(path, workload, phases, config=None):
+    # With --profile the rows/second of every phase so far are kept next to the timings
+    profile = profiling.phase_table()
+    if profile is not None:
+        config = dict(config or {}, profile=profile)
+    result = {
+        "workload": workload,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": config or {},
+        "peak_rss_mb": peak_rss_mb(),
+        "phases": phases,
+    }
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def read_results(paths):
+    results = []
+    for path in paths:
+        with open(path) as f:
+            results.append(json.load(f))
+    return results
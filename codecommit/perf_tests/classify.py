@@ -1,54 +1,345 @@
 # Fragment code (classify.py) from https://www.dominodatalab.com/blog/credit-card-fraud-detection-using-xgboost-smote-and-threshold-moving 
 # Dataset (creditcard.csv) from https://www.kaggle.com/datasets/mlg-ulb/creditcardfraud 
 
+import os
 import time
 import random
-from datetime import datetime
-import pandas as pd
-from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split
-from imblearn.over_sampling import SMOTE
+import argparse
+from dataset import dataset_hash, load_dataset, utc_offset
+import benchmark
+import model_store
+import profiling
 
-random.seed(1000)
+# XGBoost, scikit-learn, imbalanced-learn and the modules of the other modes are imported by the functions which
+# use them: a run only pays the import time of the libraries of its own path (python3 startup.py). Each path
+# imports them before its first timer, no timing or profiling phase includes import time
 
-dataDF = pd.read_csv("creditcard.csv")
-dataDF["Hour"] = dataDF["Time"].apply(datetime.fromtimestamp).dt.hour
+MODEL_PARAMS = {"objective": "binary:logistic", "eval_metric": "auc"}
+SPLIT_PARAMS = {"test_size": 0.2, "random_state": 1234}
+SMOTE_PARAMS = {"random_state": 1234}
 
-trainDF, testDF = train_test_split(dataDF, test_size=0.2, random_state=1234, stratify=dataDF[["Class"]])
 
-trainDF_norm = trainDF.copy()
-trainDF_norm["Amount"] = trainDF["Amount"].subtract(trainDF["Amount"].mean())
-trainDF_norm["Hour"] = trainDF["Hour"].subtract(trainDF["Hour"].mean())
-testDF_norm = testDF.copy()
-testDF_norm["Amount"] = testDF["Amount"].subtract(testDF["Amount"].mean())
-testDF_norm["Hour"] = testDF["Hour"].subtract(testDF["Hour"].mean())
+def parse_args():
+    parser = argparse.ArgumentParser(description="Credit card fraud detection with XGBoost (performance test)")
+    parser.add_argument("--data", default="creditcard.csv", help="path to the credit card dataset CSV")
+    parser.add_argument("--cache-dir", default=".cache", help="directory of the binary dataset cache")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the CSV, without reading or writing the cache")
+    parser.add_argument("--smote-jobs", type=int, default=-1, help="cores of the SMOTE neighbour search (-1: all)")
+    parser.add_argument("--benchmark", action="store_true", help="repeat training and inference, report median/p95/stddev")
+    parser.add_argument("--warmup", type=int, default=1, help="benchmark warm-up iterations per phase (not measured)")
+    parser.add_argument("--repeat", type=int, default=5, help="benchmark measured repetitions per phase")
+    parser.add_argument("--sweep-threads", action="store_true", help="benchmark training for n_jobs = 1, 2, 4, ... up to the core count")
+    parser.add_argument("--max-threads", type=int, default=None, help="largest n_jobs of the thread sweep (default: available cores)")
+    parser.add_argument("--tree-methods", nargs="+", default=["hist", "approx"], help="XGBoost tree methods of the thread sweep")
+    parser.add_argument("--inference-only", action="store_true", help="load the saved model (train once if missing) and benchmark prediction only")
+    parser.add_argument("--throughput", action="store_true", help="score the test set from K worker processes, K = 1, 2, 4, ... up to the core count")
+    parser.add_argument("--max-workers", type=int, default=None, help="largest number of worker processes of --throughput (default: available cores)")
+    parser.add_argument("--worker-threads", type=int, default=1, help="XGBoost threads per worker process of --throughput")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows per prediction call of --throughput")
+    parser.add_argument("--tasks-per-worker", type=int, default=20, help="prediction calls per worker and measured round of --throughput")
+    parser.add_argument("--treelite", action="store_true", help="compile the saved model with Treelite for this CPU, compare batched and single-row prediction with XGBoost")
+    parser.add_argument("--single-rows", type=int, default=1000, help="single-row prediction calls per backend of --treelite")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="largest allowed difference between the XGBoost and Treelite probabilities")
+    parser.add_argument("--streaming", action="store_true", help="out-of-core mode: read the CSV in chunks and train from external memory")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per CSV chunk of the streaming mode")
+    parser.add_argument("--lean", action="store_true", help="float32 NumPy pipeline with in-place normalization and QuantileDMatrix")
+    parser.add_argument("--trace-memory", action="store_true", help="report tracemalloc peak memory and allocations of the preprocessing")
+    parser.add_argument("--profile", action="store_true", help="time every phase (CSV parse, Hour feature, split, SMOTE, fit, predict) and report rows/second")
+    parser.add_argument("--cprofile-dir", default=None, help="write cProfile statistics per phase to this directory (implies --profile)")
+    parser.add_argument("--flamegraph", default=None, help="write sampled stacks per phase in collapsed format to this file (implies --profile)")
+    parser.add_argument("--sample-interval-ms", type=float, default=5.0, help="stack sampling interval of --flamegraph")
+    parser.add_argument("--model-dir", default=None, help="directory of saved models (default: <cache-dir>/models)")
+    parser.add_argument("--output", default="results.json", help="JSON result file (timings, CPU architecture, core count, library versions)")
+    return parser.parse_args()
 
-trainDF = trainDF_norm
-testDF = testDF_norm
-trainDF = trainDF.drop(["Time"], axis=1)
-testDF = testDF.drop(["Time"], axis=1)
 
-X_train = trainDF.iloc[:, trainDF.columns != "Class"]
-y_train = trainDF.iloc[:, trainDF.columns == "Class"]
-X_test = testDF.iloc[:, testDF.columns != "Class"]
-y_test = testDF.iloc[:, testDF.columns == "Class"]
-X_train.head()
+def split(dataDF):
+    from sklearn.model_selection import train_test_split
+    return train_test_split(dataDF, stratify=dataDF[["Class"]], **SPLIT_PARAMS)
 
-X_train_smote, y_train_smote = SMOTE(random_state=1234).fit_resample(X_train, y_train)
 
-model = XGBClassifier(objective="binary:logistic", eval_metric="auc")
+def preprocess(dataDF):
+    with profiling.phase("split", rows=len(dataDF)):
+        trainDF, testDF = split(dataDF)
 
-start_time = time.time()
+    with profiling.phase("normalize", rows=len(dataDF)):
+        return normalize(trainDF, testDF)
 
-model.fit(X_train_smote, y_train_smote)
 
-print("\n\n")
-print("Model Training --- %s seconds ---" % (time.time() - start_time))
-print("\n\n")
+def normalize(trainDF, testDF):
+    trainDF_norm = trainDF.copy()
+    trainDF_norm["Amount"] = trainDF["Amount"].subtract(trainDF["Amount"].mean())
+    trainDF_norm["Hour"] = trainDF["Hour"].subtract(trainDF["Hour"].mean())
+    testDF_norm = testDF.copy()
+    testDF_norm["Amount"] = testDF["Amount"].subtract(testDF["Amount"].mean())
+    testDF_norm["Hour"] = testDF["Hour"].subtract(testDF["Hour"].mean())
 
-start_time = time.time()
+    trainDF = trainDF_norm
+    testDF = testDF_norm
+    trainDF = trainDF.drop(["Time"], axis=1)
+    testDF = testDF.drop(["Time"], axis=1)
 
-y_pred = model.predict_proba(X_test)[:,1]
+    X_train = trainDF.iloc[:, trainDF.columns != "Class"]
+    y_train = trainDF.iloc[:, trainDF.columns == "Class"]
+    X_test = testDF.iloc[:, testDF.columns != "Class"]
+    y_test = testDF.iloc[:, testDF.columns == "Class"]
+    return X_train, y_train, X_test, y_test
 
-print("Model Predict --- %s seconds ---" % (time.time() - start_time))
-print("\n\n")
+
+def build_model(**params):
+    from xgboost import XGBClassifier
+    return XGBClassifier(**dict(MODEL_PARAMS, **params))
+
+
+def model_file(args):
+    # Everything which changes the trained model is part of its key
+    params = {"model": MODEL_PARAMS, "split": SPLIT_PARAMS, "smote": SMOTE_PARAMS, "utc_offset": utc_offset()}
+    model_dir = args.model_dir or os.path.join(args.cache_dir, "models")
+    return model_store.model_path(model_dir, model_store.model_key(dataset_hash(args.data), params))
+
+
+def model_metadata(dataDF, X_train_smote):
+    # Training means of the normalized columns, needed to score raw transactions (serve.py)
+    trainDF, _ = split(dataDF)
+    return {
+        "amount_mean": float(trainDF["Amount"].mean()),
+        "hour_mean": float(trainDF["Hour"].mean()),
+        "train_rows": len(X_train_smote),
+        "model_params": MODEL_PARAMS,
+    }
+
+
+def resample(args, X_train, y_train):
+    from resample import smote_resample
+    # Only used on a cache miss, but imported here so the SMOTE phase of a miss doesn't include it
+    import sklearn.neighbors, imblearn.over_sampling  # noqa: F401
+    start_time = time.time()
+
+    with profiling.phase("smote", rows=len(X_train)):
+        X_train_smote, y_train_smote, cache_status = smote_resample(
+            X_train, y_train, SMOTE_PARAMS, cache_dir=None if args.no_cache else args.cache_dir, n_jobs=args.smote_jobs)
+
+    print("\n\n")
+    print("Data Resampling (SMOTE, cache %s) --- %s seconds ---" % (cache_status, time.time() - start_time))
+    return X_train_smote, y_train_smote
+
+
+def run_once(args, X_train_smote, y_train_smote, X_test):
+    model = build_model()
+
+    start_time = time.perf_counter_ns()
+
+    with profiling.phase("fit", rows=len(X_train_smote)):
+        model.fit(X_train_smote, y_train_smote)
+    train_ns = time.perf_counter_ns() - start_time
+
+    print("\n\n")
+    print("Model Training --- %s seconds ---" % (train_ns / 1e9))
+    print("\n\n")
+
+    start_time = time.perf_counter_ns()
+
+    with profiling.phase("predict", rows=len(X_test)):
+        y_pred = model.predict_proba(X_test)[:,1]
+    predict_ns = time.perf_counter_ns() - start_time
+
+    print("Model Predict --- %s seconds ---" % (predict_ns / 1e9))
+    print("\n\n")
+    print("Peak RSS --- %.1f MB ---" % benchmark.peak_rss_mb())
+    print("\n\n")
+
+    phases = {
+        "train": benchmark.summarize([train_ns]),
+        "predict": benchmark.summarize([predict_ns]),
+    }
+    config = {
+        "warmup": 0,
+        "repeat": 1,
+        "train_rows": len(X_train_smote),
+        "test_rows": len(X_test),
+        "model_params": MODEL_PARAMS,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud", phases, config)
+    print("Results written to %s" % args.output)
+    return model
+
+
+def run_benchmark(args, X_train_smote, y_train_smote, X_test):
+    model = build_model()
+
+    # A profiling phase covers all warm-up and measured runs, its rows are the rows of every run
+    runs = args.warmup + args.repeat
+    with profiling.phase("fit", rows=len(X_train_smote) * runs):
+        train_samples = benchmark.measure(lambda: build_model().fit(X_train_smote, y_train_smote),
+                                          warmup=args.warmup, repeat=args.repeat)
+    model.fit(X_train_smote, y_train_smote)
+    with profiling.phase("predict", rows=len(X_test) * runs):
+        predict_samples = benchmark.measure(lambda: model.predict_proba(X_test)[:,1],
+                                            warmup=args.warmup, repeat=args.repeat)
+
+    phases = {
+        "train": benchmark.summarize(train_samples),
+        "predict": benchmark.summarize(predict_samples),
+    }
+    print("\n\n")
+    benchmark.print_summary("Model Training", phases["train"])
+    benchmark.print_summary("Model Predict", phases["predict"])
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "train_rows": len(X_train_smote),
+        "test_rows": len(X_test),
+        "model_params": MODEL_PARAMS,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud", phases, config)
+    print("Results written to %s" % args.output)
+    return model
+
+
+def run_inference_only(args, path, X_test):
+    # Cold: deserialize the booster and predict once, warm: repeated predictions with the loaded model
+    start = time.perf_counter_ns()
+    model, _ = model_store.load_model(path)
+    load_ns = time.perf_counter_ns() - start
+
+    start = time.perf_counter_ns()
+    model.predict_proba(X_test)[:,1]
+    first_predict_ns = time.perf_counter_ns() - start
+
+    predict_samples = benchmark.measure(lambda: model.predict_proba(X_test)[:,1],
+                                        warmup=args.warmup, repeat=args.repeat)
+
+    phases = {
+        "load": benchmark.summarize([load_ns]),
+        "predict_cold": benchmark.summarize([first_predict_ns]),
+        "predict": benchmark.summarize(predict_samples),
+    }
+    print("\n\n")
+    print("Model Load (cold) --- %s seconds ---" % phases["load"]["median_s"])
+    print("Model Predict (cold, first call) --- %s seconds ---" % phases["predict_cold"]["median_s"])
+    benchmark.print_summary("Model Predict (warm)", phases["predict"])
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "test_rows": len(X_test),
+        "model_file": os.path.basename(path),
+        "model_params": MODEL_PARAMS,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud_inference", phases, config)
+    print("Results written to %s" % args.output)
+
+
+def run_thread_sweep(args, X_train_smote, y_train_smote):
+    thread_counts = benchmark.scaling_steps(args.max_threads)
+    phases = {}
+
+    print("\n\n")
+    print("%-12s %8s %12s %12s %9s %11s" % ("tree_method", "n_jobs", "median (s)", "p95 (s)", "speedup", "efficiency"))
+    for tree_method in args.tree_methods:
+        baseline = None
+        for n_jobs in thread_counts:
+            fit = lambda: build_model(tree_method=tree_method, n_jobs=n_jobs).fit(X_train_smote, y_train_smote)
+            summary = benchmark.summarize(benchmark.measure(fit, warmup=args.warmup, repeat=args.repeat))
+            baseline = baseline or summary["median_s"]
+            summary["tree_method"] = tree_method
+            summary["n_jobs"] = n_jobs
+            summary["speedup"] = baseline / summary["median_s"]
+            summary["efficiency"] = summary["speedup"] / n_jobs
+            phases["train_%s_n%d" % (tree_method, n_jobs)] = summary
+            print("%-12s %8d %12.5f %12.5f %8.2fx %10.1f%%" % (tree_method, n_jobs, summary["median_s"], summary["p95_s"],
+                                                              summary["speedup"], summary["efficiency"] * 100))
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "train_rows": len(X_train_smote),
+        "thread_counts": thread_counts,
+        "tree_methods": args.tree_methods,
+        "model_params": MODEL_PARAMS,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud_thread_sweep", phases, config)
+    print("Results written to %s" % args.output)
+
+
+def main():
+    args = parse_args()
+
+    random.seed(1000)
+
+    if args.profile or args.cprofile_dir or args.flamegraph:
+        profiling.enable(args.cprofile_dir, args.flamegraph, args.sample_interval_ms)
+    try:
+        run(args)
+    finally:
+        profiling.disable()
+
+
+def run(args):
+    if args.streaming:
+        from streaming import run_streaming
+        run_streaming(args, MODEL_PARAMS, SPLIT_PARAMS)
+        return
+    if args.lean:
+        from lean import run_lean
+        run_lean(args, MODEL_PARAMS, SPLIT_PARAMS, SMOTE_PARAMS)
+        return
+
+    # Loading (pandas), split (scikit-learn) and the model load or fit (XGBoost) of every path below
+    import pandas, sklearn.model_selection, xgboost  # noqa: F401
+
+    start_time = time.time()
+
+    dataDF, cache_status = load_dataset(args.data, cache_dir=None if args.no_cache else args.cache_dir)
+
+    print("\n\n")
+    print("Data Load (cache %s) --- %s seconds ---" % (cache_status, time.time() - start_time))
+
+    start_time = time.time()
+
+    X_train, y_train, X_test, y_test = preprocess(dataDF)
+
+    print("\n\n")
+    print("Data Preprocessing --- %s seconds ---" % (time.time() - start_time))
+    if args.trace_memory:
+        # A second, untimed pass: tracemalloc would slow the timed one down
+        memory = {}
+        with profiling.paused(), benchmark.trace_memory(memory):
+            preprocess(dataDF)
+        benchmark.print_memory("Memory (preprocessing)", memory)
+
+    path = model_file(args)
+    if args.inference_only or args.throughput or args.treelite:
+        if not os.path.isfile(path):
+            X_train_smote, y_train_smote = resample(args, X_train, y_train)
+            print("No saved model for this dataset and parameters, training it once")
+            model = build_model().fit(X_train_smote, y_train_smote)
+            model_store.save_model(model, path, model_metadata(dataDF, X_train_smote))
+        if args.throughput:
+            from throughput import run_throughput
+            run_throughput(args, path, X_test, MODEL_PARAMS)
+        elif args.treelite:
+            from treelite_inference import run_treelite
+            run_treelite(args, path, X_test, MODEL_PARAMS)
+        else:
+            run_inference_only(args, path, X_test)
+        return
+
+    X_train_smote, y_train_smote = resample(args, X_train, y_train)
+
+    if args.sweep_threads:
+        run_thread_sweep(args, X_train_smote, y_train_smote)
+        return
+    elif args.benchmark:
+        model = run_benchmark(args, X_train_smote, y_train_smote, X_test)
+    else:
+        model = run_once(args, X_train_smote, y_train_smote, X_test)
+    model_store.save_model(model, path, model_metadata(dataDF, X_train_smote))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Loading of the credit card dataset (creditcard.csv) with an on-disk binary cache
+#
+# The first run parses the CSV and saves the columns as .npy files keyed by the SHA-256 of the CSV and the
+# local UTC offset (the Hour column depends on it), later runs memory-map those files instead of parsing
+# text again. A synthetic dataset (synthetic.py) is a directory with the same files and a manifest, given
+# instead of the CSV path and memory-mapped directly
+
+import os
+import shutil
+import hashlib
+import functools
+from datetime import datetime
+import numpy as np
+import profiling
+
+# Explicit dtypes skip pandas type inference and the float64 default
+FEATURE_COLUMNS = ["Time"] + ["V%d" % i for i in range(1, 29)] + ["Amount"]
+CSV_DTYPES = {column: np.float32 for column in FEATURE_COLUMNS}
+CSV_DTYPES["Class"] = np.int8
+
+CACHE_FILES = ("features.npy", "class.npy", "hour.npy")
+MANIFEST = "manifest.json"
+
+
+def utc_offset():
+    # Offset of the local time zone from UTC at the Unix epoch, in seconds
+    return (datetime.fromtimestamp(0) - datetime(1970, 1, 1)).total_seconds()
+
+
+def hour_of_day(seconds):
+    # Local hour with one fixed UTC offset (the zone's offset at the epoch), without a datetime object per row.
+    # DST and later offset changes are ignored: this only matches datetime.fromtimestamp(t).hour over the two
+    # days of creditcard.csv (Time starts at 0) in zones without an offset change in those days
+    return ((seconds + utc_offset()) // 3600 % 24).astype(np.int8)
+
+
+def transaction_features(rows, amount_mean, hour_mean):
+    # Raw rows in FEATURE_COLUMNS order (Time, V1..V28, Amount) to the model features (V1..V28, Amount, Hour),
+    # normalized with the given means like classify.py does
+    X = np.empty((len(rows), len(FEATURE_COLUMNS)), dtype=np.float32)
+    X[:, :-1] = rows[:, 1:]
+    X[:, -2] -= amount_mean
+    X[:, -1] = hour_of_day(rows[:, 0]) - hour_mean
+    return X
+
+
+def read_csv(csv_path):
+    # pandas is only imported by the functions which build a DataFrame, load_arrays reads a cache hit without it
+    import pandas as pd
+    with profiling.phase("csv_parse") as counters:
+        dataDF = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+        counters["rows"] = len(dataDF)
+    with profiling.phase("hour_feature", rows=len(dataDF)):
+        dataDF["Hour"] = hour_of_day(dataDF["Time"].to_numpy())
+    return dataDF
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _file_hash(path, size, mtime_ns):
+    return file_hash(path)
+
+
+def is_generated(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def dataset_hash(csv_path):
+    # Hashed once per process as long as the file is unchanged, the digest also keys saved models. The manifest
+    # of a synthetic dataset holds its size, seed and parameters, which determine every row
+    if is_generated(csv_path):
+        csv_path = os.path.join(csv_path, MANIFEST)
+    stat = os.stat(csv_path)
+    return _file_hash(os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns)
+
+
+def cache_digest(csv_path):
+    # The cached Hour column depends on the UTC offset, an entry written in another time zone is a different one
+    return hashlib.sha256(("%s %d" % (dataset_hash(csv_path), utc_offset())).encode()).hexdigest()
+
+
+def cache_entry(csv_path, cache_dir, digest):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, "%s-%s" % (name, digest))
+
+
+def write_cache(dataDF, entry):
+    # Write to a temporary directory first so an interrupted run never leaves a partial entry behind
+    tmp_entry = entry + ".tmp"
+    shutil.rmtree(tmp_entry, ignore_errors=True)
+    os.makedirs(tmp_entry)
+    np.save(os.path.join(tmp_entry, "features.npy"), dataDF[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    np.save(os.path.join(tmp_entry, "class.npy"), dataDF["Class"].to_numpy(dtype=np.int8))
+    np.save(os.path.join(tmp_entry, "hour.npy"), dataDF["Hour"].to_numpy(dtype=np.int8))
+
+    # Entries of older versions of the same CSV are stale
+    name = os.path.basename(entry).rsplit("-", 1)[0]
+    for old_entry in os.listdir(os.path.dirname(entry)):
+        if old_entry.rsplit("-", 1)[0] == name and not old_entry.endswith(".tmp"):
+            shutil.rmtree(os.path.join(os.path.dirname(entry), old_entry), ignore_errors=True)
+    os.rename(tmp_entry, entry)
+
+
+def read_arrays(entry):
+    # mmap_mode keeps the arrays on disk until they are used
+    return tuple(np.load(os.path.join(entry, f), mmap_mode="r") for f in CACHE_FILES)
+
+
+def read_cache(entry):
+    # pandas wraps the memory-mapped feature matrix without copying it
+    import pandas as pd
+    features, labels, hours = read_arrays(entry)
+    dataDF = pd.DataFrame(features, columns=FEATURE_COLUMNS, copy=False)
+    dataDF["Class"] = labels
+    dataDF["Hour"] = hours
+    return dataDF
+
+
+def load_dataset(csv_path, cache_dir=None):
+    # Returns the DataFrame and how it was obtained: "hit", "miss", "disabled" or "generated"
+    if is_generated(csv_path):
+        with profiling.phase("cache_read") as counters:
+            dataDF = read_cache(csv_path)
+            counters["rows"] = len(dataDF)
+        return dataDF, "generated"
+    if cache_dir is None:
+        return read_csv(csv_path), "disabled"
+
+    entry = cache_entry(csv_path, cache_dir, cache_digest(csv_path))
+    if all(os.path.isfile(os.path.join(entry, f)) for f in CACHE_FILES):
+        with profiling.phase("cache_read") as counters:
+            dataDF = read_cache(entry)
+            counters["rows"] = len(dataDF)
+        return dataDF, "hit"
+
+    dataDF = read_csv(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    with profiling.phase("cache_write", rows=len(dataDF)):
+        write_cache(dataDF, entry)
+    return dataDF, "miss"
+
+
+def load_arrays(csv_path, cache_dir=None):
+    # Same as load_dataset, but returns the raw (features, labels, hours) arrays, memory-mapped from the cache
+    if is_generated(csv_path):
+        return read_arrays(csv_path), "generated"
+    if cache_dir is None:
+        dataDF = read_csv(csv_path)
+        return (dataDF[FEATURE_COLUMNS].to_numpy(dtype=np.float32), dataDF["Class"].to_numpy(),
+                dataDF["Hour"].to_numpy()), "disabled"
+
+    entry = cache_entry(csv_path, cache_dir, cache_digest(csv_path))
+    cache_status = "hit"
+    if not all(os.path.isfile(os.path.join(entry, f)) for f in CACHE_FILES):
+        os.makedirs(cache_dir, exist_ok=True)
+        write_cache(read_csv(csv_path), entry)
+        cache_status = "miss"
+    return read_arrays(entry), cache_status
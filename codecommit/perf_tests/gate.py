@@ -0,0 +1,73 @@
+# Regression gate: exits with an error when a phase got slower than its stored baseline
+#
+# The baseline holds the median time in seconds per workload, architecture and phase:
+#   {"xgboost_fraud": {"x86_64": {"train": 58.14, "predict": 0.0318}, "aarch64": {...}}}
+# Results of a compute sweep build are keyed by architecture and build_config like in aggregate.py (e.g.
+# "aarch64 SMALL-AMAZON_LINUX_2_ARM_2"), so they are only checked against a baseline of the same configuration.
+# Only phases present in the baseline are checked, --update writes the given results as the new baseline
+
+import sys
+import json
+import argparse
+import benchmark
+from aggregate import architecture_label
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fail when performance regresses against a stored baseline")
+    parser.add_argument("results", nargs="+", help="JSON result files written by classify.py (or the other perf tests)")
+    parser.add_argument("--baseline", default="baseline.json", help="baseline medians per workload/architecture/phase")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown as a fraction (0.15 = 15%%)")
+    parser.add_argument("--update", action="store_true", help="replace the baseline entries with the given results")
+    return parser.parse_args()
+
+
+def check(results, baseline, threshold):
+    # Returns one (workload, architecture, phase, baseline_s, current_s, regressed) tuple per checked phase
+    checks = []
+    for result in results:
+        workload, architecture = result["workload"], architecture_label(result)
+        expected = baseline.get(workload, {}).get(architecture, {})
+        for phase, baseline_s in sorted(expected.items()):
+            if phase not in result["phases"]:
+                continue
+            current_s = result["phases"][phase]["median_s"]
+            checks.append((workload, architecture, phase, baseline_s, current_s, current_s > baseline_s * (1 + threshold)))
+    return checks
+
+
+def update(results, baseline):
+    for result in results:
+        entry = baseline.setdefault(result["workload"], {}).setdefault(architecture_label(result), {})
+        entry.update({phase: summary["median_s"] for phase, summary in result["phases"].items()})
+    return baseline
+
+
+def main():
+    args = parse_args()
+    results = benchmark.read_results(args.results)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if args.update:
+        with open(args.baseline, "w") as f:
+            json.dump(update(results, baseline), f, indent=2, sort_keys=True)
+        print("Baseline %s updated from %d result(s)" % (args.baseline, len(results)))
+        return 0
+
+    checks = check(results, baseline, args.threshold)
+    for workload, architecture, phase, baseline_s, current_s, regressed in checks:
+        print("%-4s %s %s %s --- %.5fs (baseline %.5fs, %+.1f%%) ---"
+              % ("FAIL" if regressed else "OK", workload, architecture, phase, current_s, baseline_s,
+                 (current_s / baseline_s - 1) * 100))
+    if not checks:
+        print("No result matches a baseline entry, nothing checked")
+    regressions = sum(1 for *_, regressed in checks if regressed)
+    if regressions:
+        print("%d phase(s) regressed by more than %.0f%%" % (regressions, args.threshold * 100))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# Load generator for serve.py: replays transactions from creditcard.csv with concurrent keep-alive clients
+# and reports client-side per-request latency (p50/p99) and throughput. The server statistics are reset after
+# the warm-up, so both sides report the same measured requests
+
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+from dataset import FEATURE_COLUMNS, load_dataset
+import benchmark
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay creditcard.csv transactions against the scoring server")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="base URL of serve.py")
+    parser.add_argument("--data", default="creditcard.csv", help="path to the credit card dataset CSV")
+    parser.add_argument("--cache-dir", default=".cache", help="directory of the binary dataset cache")
+    parser.add_argument("--requests", type=int, default=10000, help="total number of requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of clients sending requests in parallel")
+    parser.add_argument("--rows-per-request", type=int, default=1, help="transactions per request")
+    parser.add_argument("--warmup", type=int, default=100, help="requests sent before measuring")
+    parser.add_argument("--output", default=None, help="optional JSON result file")
+    return parser.parse_args()
+
+
+def build_payloads(data, cache_dir, count, rows_per_request):
+    # Payloads are encoded up front so JSON serialization on the client doesn't skew the latency
+    dataDF, _ = load_dataset(data, cache_dir=cache_dir)
+    rows = dataDF[FEATURE_COLUMNS].to_numpy().tolist()
+    payloads = []
+    for i in range(count):
+        start = (i * rows_per_request) % len(rows)
+        batch = rows[start:start + rows_per_request]
+        payloads.append(json.dumps({"rows": batch}).encode())
+    return payloads
+
+
+def client(url, payloads, latencies_ns, errors):
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+    headers = {"Content-Type": "application/json"}
+    for payload in payloads:
+        start = time.perf_counter_ns()
+        connection.request("POST", "/predict", body=payload, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies_ns.append(time.perf_counter_ns() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    connection.close()
+
+
+def run(url, payloads, concurrency):
+    # Returns the latency of every request and the wall time of the whole run
+    latencies_ns = []
+    errors = []
+    threads = [threading.Thread(target=client, args=(url, payloads[i::concurrency], latencies_ns, errors))
+               for i in range(concurrency)]
+    start = time.perf_counter_ns()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies_ns, errors, (time.perf_counter_ns() - start) / 1e9
+
+
+def server_stats(url, method="GET", path="/stats"):
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+    connection.request(method, path)
+    stats = json.loads(connection.getresponse().read())
+    connection.close()
+    return stats
+
+
+def main():
+    args = parse_args()
+    url = urlparse(args.url)
+
+    payloads = build_payloads(args.data, args.cache_dir, args.warmup + args.requests, args.rows_per_request)
+    if args.warmup:
+        run(url, payloads[:args.warmup], args.concurrency)
+        server_stats(url, "POST", "/stats/reset")
+
+    latencies_ns, errors, elapsed_s = run(url, payloads[args.warmup:], args.concurrency)
+    latency = benchmark.summarize(latencies_ns)
+    throughput = len(latencies_ns) / elapsed_s
+
+    print("\n\n")
+    print("Requests --- %d (%d errors), %d concurrent clients, %d rows per request ---"
+          % (len(latencies_ns), len(errors), args.concurrency, args.rows_per_request))
+    print("Latency --- p50 %.3fms, p99 %.3fms, max %.3fms ---"
+          % (latency["median_s"] * 1000, latency["p99_s"] * 1000, latency["max_s"] * 1000))
+    print("Throughput --- %.1f requests/s, %.1f predictions/s ---" % (throughput, throughput * args.rows_per_request))
+    stats = server_stats(url)
+    print("Server --- %s ---" % json.dumps(stats))
+    print("\n\n")
+
+    if args.output:
+        del latency["samples_s"]
+        latency["throughput_rps"] = throughput
+        latency["errors"] = len(errors)
+        config = {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "rows_per_request": args.rows_per_request,
+            "server": stats,
+        }
+        benchmark.write_result(args.output, "xgboost_fraud_serving", {"request": latency}, config)
+        print("Results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Saved XGBoost models, so runs which only measure inference don't have to retrain
+#
+# A model is stored as a UBJSON booster next to a small JSON file with the values needed to use it
+# (e.g. the training means of the normalized columns). The file name is a hash of the training data,
+# the training parameters and the XGBoost version, any change to one of them means retraining
+
+import os
+import json
+import hashlib
+from importlib import metadata
+
+
+def xgboost_version():
+    # From the package metadata: computing the key of a model doesn't import XGBoost
+    return metadata.version("xgboost")
+
+
+def model_key(data_digest, params):
+    payload = json.dumps({"data": data_digest, "params": params, "xgboost": xgboost_version()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def model_path(model_dir, key):
+    return os.path.join(model_dir, "xgboost-%s.ubj" % key)
+
+
+def save_model(model, path, metadata=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write next to the target and rename, a concurrent reader never sees a partial booster
+    model.save_model(path + ".tmp.ubj")
+    with open(path + ".json", "w") as f:
+        json.dump(dict(metadata or {}, xgboost=xgboost_version()), f, indent=2)
+    os.replace(path + ".tmp.ubj", path)
+
+
+def load_model(path):
+    # Returns the model and its metadata, or (None, None) when it hasn't been saved yet
+    if not os.path.isfile(path):
+        return None, None
+    from xgboost import XGBClassifier
+    model = XGBClassifier()
+    model.load_model(path)
+    metadata = {}
+    if os.path.isfile(path + ".json"):
+        with open(path + ".json") as f:
+            metadata = json.load(f)
+    return model, metadata
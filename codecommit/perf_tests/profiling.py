@@ -0,0 +1,170 @@
+# Per-phase instrumentation of the performance tests
+#
+# Code marks its phases with `with profiling.phase("csv_parse") as counters:`, which does nothing until
+# enable() is called. When enabled, every phase is timed and reports rows/second (set counters["rows"] or
+# pass rows=), the phase table is stored in the config of the result file (benchmark.write_result), and can optionally be captured with cProfile (one .prof/.txt file per phase) and by a
+# sampling profiler writing collapsed stacks ("phase;module:function;... count"), the input format of
+# flamegraph.pl and speedscope.
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+from collections import Counter
+
+_profiler = None
+
+
+class SamplingProfiler:
+    # Samples the stack of the main thread every interval_ms from a background thread. Time spent in C
+    # extensions shows up on the Python frame which called them (e.g. XGBClassifier.fit)
+
+    def __init__(self, interval_ms=5.0):
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.phase = None
+        self.thread_id = threading.main_thread().ident
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.phase is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s:%s" % (os.path.splitext(os.path.basename(code.co_filename))[0], code.co_name))
+                frame = frame.f_back
+            stack.append(self.phase)
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write("%s %d\n" % (stack, count))
+
+
+class Profiler:
+
+    def __init__(self, cprofile_dir=None, collapsed_path=None, sample_interval_ms=5.0):
+        self.cprofile_dir = cprofile_dir
+        self.collapsed_path = collapsed_path
+        self.sampler = SamplingProfiler(sample_interval_ms) if collapsed_path else None
+        self.phases = []
+        self.depth = 0
+        if cprofile_dir:
+            os.makedirs(cprofile_dir, exist_ok=True)
+        if self.sampler:
+            self.sampler.start()
+
+    @contextlib.contextmanager
+    def phase(self, name, rows=None):
+        counters = {"rows": rows}
+        # Only the outermost phase is captured by cProfile, a second profiler can't be enabled at once
+        profile = cProfile.Profile() if self.cprofile_dir and self.depth == 0 else None
+        previous_phase = self.sampler.phase if self.sampler else None
+        if self.sampler:
+            self.sampler.phase = name
+        self.depth += 1
+        if profile:
+            profile.enable()
+        start = time.perf_counter_ns()
+        try:
+            yield counters
+        finally:
+            elapsed_s = (time.perf_counter_ns() - start) / 1e9
+            if profile:
+                profile.disable()
+            self.depth -= 1
+            if self.sampler:
+                self.sampler.phase = previous_phase
+            if profile:
+                self._dump(name, profile)
+            rows = counters.get("rows")
+            self.phases.append({
+                "phase": name,
+                "seconds": elapsed_s,
+                "rows": rows,
+                "rows_per_s": rows / elapsed_s if rows and elapsed_s else None,
+            })
+
+    def _dump(self, name, profile):
+        path = os.path.join(self.cprofile_dir, "%02d_%s" % (len(self.phases), name))
+        profile.dump_stats(path + ".prof")
+        with open(path + ".txt", "w") as f:
+            pstats.Stats(profile, stream=f).sort_stats("cumulative").print_stats(30)
+
+    def report(self):
+        total_s = sum(phase["seconds"] for phase in self.phases) or 1.0
+        print("%-20s %12s %12s %14s %7s" % ("phase", "seconds", "rows", "rows/s", "share"))
+        for phase in self.phases:
+            print("%-20s %12.5f %12s %14s %6.1f%%" % (
+                phase["phase"], phase["seconds"],
+                phase["rows"] if phase["rows"] is not None else "-",
+                "%.0f" % phase["rows_per_s"] if phase["rows_per_s"] else "-",
+                phase["seconds"] / total_s * 100))
+
+    def close(self):
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler.write(self.collapsed_path)
+
+
+def enable(cprofile_dir=None, collapsed_path=None, sample_interval_ms=5.0):
+    global _profiler
+    _profiler = Profiler(cprofile_dir, collapsed_path, sample_interval_ms)
+    return _profiler
+
+
+def phase_table():
+    # Phases timed so far (phase, seconds, rows, rows_per_s), None when profiling is off
+    return list(_profiler.phases) if _profiler else None
+
+
+def disable():
+    # Stops the sampler, writes the collapsed stacks and prints the phase report
+    global _profiler
+    if _profiler is None:
+        return
+    _profiler.close()
+    print("\n\n")
+    _profiler.report()
+    if _profiler.cprofile_dir:
+        print("cProfile output per phase written to %s" % _profiler.cprofile_dir)
+    if _profiler.collapsed_path:
+        print("Collapsed stacks written to %s (e.g. flamegraph.pl %s > flamegraph.svg)"
+              % (_profiler.collapsed_path, _profiler.collapsed_path))
+    print("\n\n")
+    _profiler = None
+
+
+@contextlib.contextmanager
+def paused():
+    # Phases inside the block aren't recorded, e.g. a second pass of the same work which only measures memory
+    global _profiler
+    profiler, _profiler = _profiler, None
+    try:
+        yield
+    finally:
+        _profiler = profiler
+
+
+@contextlib.contextmanager
+def phase(name, rows=None):
+    if _profiler is None:
+        yield {"rows": rows}
+        return
+    with _profiler.phase(name, rows) as counters:
+        yield counters
@@ -0,0 +1,71 @@
+# SMOTE oversampling as a separate, cached stage
+#
+# The output only depends on the training split and the SMOTE parameters (the seed is fixed), so it is
+# saved as .npy files keyed by a hash of both and reused by later runs. The nearest-neighbour search,
+# which dominates SMOTE, runs on all cores.
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from importlib import metadata
+
+
+def smote(params, n_jobs=-1):
+    # imbalanced-learn and scikit-learn are only imported on a cache miss
+    from sklearn.neighbors import NearestNeighbors
+    from imblearn.over_sampling import SMOTE
+    # Same neighbours as SMOTE(k_neighbors=k): the sample itself plus k neighbours, searched in parallel
+    params = dict(params)
+    k_neighbors = params.pop("k_neighbors", 5)
+    return SMOTE(k_neighbors=NearestNeighbors(n_neighbors=k_neighbors + 1, n_jobs=n_jobs), **params)
+
+
+def resample_key(X_train, y_train, params):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"params": params, "imblearn": metadata.version("imbalanced-learn"), "columns": list(X_train.columns)},
+                             sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(X_train.to_numpy()).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y_train)).tobytes())
+    return digest.hexdigest()
+
+
+def write_cache(entry, X_res, y_res):
+    tmp_entry = entry + ".tmp"
+    shutil.rmtree(tmp_entry, ignore_errors=True)
+    os.makedirs(tmp_entry)
+    np.save(os.path.join(tmp_entry, "X.npy"), X_res.to_numpy())
+    np.save(os.path.join(tmp_entry, "y.npy"), np.asarray(y_res).ravel())
+    with open(os.path.join(tmp_entry, "columns.json"), "w") as f:
+        json.dump({"X": {column: str(dtype) for column, dtype in X_res.dtypes.items()},
+                   "y": list(y_res.columns) if isinstance(y_res, pd.DataFrame) else y_res.name}, f)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.rename(tmp_entry, entry)
+
+
+def read_cache(entry):
+    with open(os.path.join(entry, "columns.json")) as f:
+        columns = json.load(f)
+    X_res = pd.DataFrame(np.load(os.path.join(entry, "X.npy")), columns=list(columns["X"])).astype(columns["X"])
+    y = np.load(os.path.join(entry, "y.npy"))
+    y_res = pd.DataFrame(y, columns=columns["y"]) if isinstance(columns["y"], list) else pd.Series(y, name=columns["y"])
+    return X_res, y_res
+
+
+def smote_resample(X_train, y_train, params, cache_dir=None, n_jobs=-1):
+    # Returns the resampled data and how it was obtained: "hit", "miss" or "disabled"
+    if cache_dir is None:
+        X_res, y_res = smote(params, n_jobs).fit_resample(X_train, y_train)
+        return X_res, y_res, "disabled"
+
+    entry = os.path.join(cache_dir, "smote-%s" % resample_key(X_train, y_train, params))
+    if os.path.isfile(os.path.join(entry, "columns.json")):
+        X_res, y_res = read_cache(entry)
+        return X_res, y_res, "hit"
+
+    X_res, y_res = smote(params, n_jobs).fit_resample(X_train, y_train)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_cache(entry, X_res, y_res)
+    return X_res, y_res, "miss"
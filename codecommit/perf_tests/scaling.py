@@ -0,0 +1,123 @@
+# Throughput across dataset sizes: the same work on synthetic datasets of 10k to 100M rows
+#
+# Every size of the ladder is generated once (synthetic.py, reused by later runs) and memory-mapped, then
+# three phases are measured: a scan of the feature columns (memory bandwidth), prediction of every row in
+# chunks with one model trained on the smallest size (the same trees at every size) and XGBoost training on
+# the first --max-train-rows rows. Rows/s and GB/s per size show where the data stops fitting in the CPU
+# caches of the host (listed in the report) and, for the largest sizes, in memory:
+#
+#   python3 scaling.py --sizes 10k 100k 1M 10M 100M --data-dir synthetic
+
+import os
+import time
+import argparse
+import numpy as np
+from xgboost import XGBClassifier
+from dataset import read_arrays, transaction_features
+from synthetic import dataset_bytes, generate, parse_rows, row_label
+import benchmark
+
+# Same model as classify.py, with the tree method fixed: XGBoost picks one by data size otherwise
+MODEL_PARAMS = {"objective": "binary:logistic", "eval_metric": "auc", "tree_method": "hist"}
+
+
+def model_matrix(features, start, end):
+    # Model features (V1..V28, Amount, Hour) of rows start .. end, the trees split on raw values
+    return transaction_features(features[start:end], 0.0, 0.0)
+
+
+def predict_all(model, features, chunk_rows):
+    for start in range(0, len(features), chunk_rows):
+        model.predict_proba(model_matrix(features, start, start + chunk_rows))
+
+
+def train(features, labels, rows):
+    return XGBClassifier(**MODEL_PARAMS).fit(model_matrix(features, 0, rows), labels[:rows])
+
+
+def fits_in(data_bytes, caches):
+    # Smallest cache level holding the data, or "memory"
+    for level, size in sorted(caches.items(), key=lambda item: item[1]):
+        if data_bytes <= size:
+            return level
+    return "memory"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scan, predict and train throughput on synthetic datasets of increasing size")
+    parser.add_argument("--sizes", type=parse_rows, nargs="+", default=[parse_rows(size) for size in ("10k", "100k", "1M", "10M")],
+                        help="rows of each dataset of the ladder, e.g. 10k 1M 100M (10k to 100M)")
+    parser.add_argument("--data-dir", default="synthetic", help="directory of the generated datasets")
+    parser.add_argument("--seed", type=int, default=1234, help="seed of the generated datasets")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="rows per generation and prediction step")
+    parser.add_argument("--max-train-rows", type=int, default=1_000_000, help="largest number of training rows")
+    parser.add_argument("--warmup", type=int, default=1, help="warm-up iterations per phase (not measured)")
+    parser.add_argument("--repeat", type=int, default=3, help="measured repetitions of the scan and predict phases")
+    parser.add_argument("--train-repeat", type=int, default=1, help="measured repetitions of the train phase")
+    parser.add_argument("--output", default="scaling-results.json", help="JSON result file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = sorted(set(args.sizes))
+    caches = benchmark.cache_sizes()
+    phases = {}
+    ladder = []
+    model = None
+
+    for rows in sizes:
+        label = row_label(rows)
+        path = os.path.join(args.data_dir, "creditcard-%s" % label)
+        start = time.perf_counter_ns()
+        if generate(path, rows, args.seed, args.chunk_rows):
+            phases["generate_%s" % label] = benchmark.summarize([time.perf_counter_ns() - start])
+        features, labels, _ = read_arrays(path)
+
+        train_rows = min(rows, args.max_train_rows)
+        phases["scan_%s" % label] = benchmark.summarize(benchmark.measure(lambda: features.sum(axis=0),
+                                                                          warmup=args.warmup, repeat=args.repeat))
+        models = []
+        phases["train_%s" % label] = benchmark.summarize(benchmark.measure(lambda: models.append(train(features, labels, train_rows)),
+                                                                           warmup=0, repeat=args.train_repeat))
+        # One model for every size, the last one measured on the smallest dataset
+        model = model or models[-1]
+        phases["predict_%s" % label] = benchmark.summarize(benchmark.measure(lambda: predict_all(model, features, args.chunk_rows),
+                                                                             warmup=args.warmup, repeat=args.repeat))
+
+        phases["scan_%s" % label]["gb_per_s"] = features.nbytes / phases["scan_%s" % label]["median_s"] / 1e9
+        phases["train_%s" % label]["rows_per_s"] = train_rows / phases["train_%s" % label]["median_s"]
+        phases["predict_%s" % label]["rows_per_s"] = rows / phases["predict_%s" % label]["median_s"]
+        ladder.append({"rows": rows, "label": label, "path": path, "data_mb": dataset_bytes(rows) / 1e6,
+                       "fits_in": fits_in(features.nbytes, caches), "train_rows": train_rows})
+        print("Dataset %s (%s) --- scan %.1f GB/s, predict %.0f rows/s, train %.0f rows/s ---"
+              % (label, ladder[-1]["fits_in"], phases["scan_%s" % label]["gb_per_s"],
+                 phases["predict_%s" % label]["rows_per_s"], phases["train_%s" % label]["rows_per_s"]), flush=True)
+        del features, labels
+
+    print("\n\n")
+    print("CPU caches: %s" % (", ".join("%s %d KB" % (level, size // 1024) for level, size in caches.items()) or "unknown"))
+    print("%-8s %10s %8s %10s %16s %14s" % ("rows", "data (MB)", "fits in", "scan GB/s", "predict rows/s", "train rows/s"))
+    for step in ladder:
+        label = step["label"]
+        print("%-8s %10.1f %8s %10.2f %16.0f %14.0f" % (label, step["data_mb"], step["fits_in"], phases["scan_%s" % label]["gb_per_s"],
+                                                       phases["predict_%s" % label]["rows_per_s"], phases["train_%s" % label]["rows_per_s"]))
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "train_repeat": args.train_repeat,
+        "seed": args.seed,
+        "chunk_rows": args.chunk_rows,
+        "max_train_rows": args.max_train_rows,
+        "cache_sizes": caches,
+        "ladder": ladder,
+        "model_params": MODEL_PARAMS,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud_scaling", phases, config)
+    print("Results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
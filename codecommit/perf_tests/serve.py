@@ -0,0 +1,234 @@
+# Low-latency fraud scoring server: the saved model is loaded once at startup (trained first if missing),
+# transactions arrive over HTTP
+# and concurrent requests are grouped into micro-batches before calling XGBoost
+#
+# POST /predict  {"rows": [[Time, V1, ..., V28, Amount], ...]}  ->  {"probabilities": [...]}
+# GET  /stats    per-request latency (p50/p99), throughput and batch sizes seen by the server
+# POST /stats/reset  clears the statistics, e.g. after the warm-up requests of a load test
+
+import json
+import time
+import queue
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from dataset import FEATURE_COLUMNS, load_dataset, transaction_features
+from classify import build_model, model_file, model_metadata, preprocess, resample
+import benchmark
+import model_store
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fraud scoring server with micro-batching")
+    parser.add_argument("--data", default="creditcard.csv", help="path to the credit card dataset CSV (training data)")
+    parser.add_argument("--cache-dir", default=".cache", help="directory of the binary dataset cache")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the CSV and run SMOTE, without the caches")
+    parser.add_argument("--smote-jobs", type=int, default=-1, help="cores of the SMOTE neighbour search (-1: all)")
+    parser.add_argument("--model-dir", default=None, help="directory of saved models (default: <cache-dir>/models)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="largest number of rows predicted together")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="longest time a request waits for a batch to fill")
+    return parser.parse_args()
+
+
+class FraudModel:
+    # Applies the same feature engineering as classify.py to raw transactions before predicting
+
+    def __init__(self, model, amount_mean, hour_mean):
+        self.model = model
+        self.amount_mean = amount_mean
+        self.hour_mean = hour_mean
+
+    def predict(self, rows):
+        return self.model.predict_proba(transaction_features(rows, self.amount_mean, self.hour_mean))[:, 1]
+
+
+def load_model(args):
+    path = model_file(args)
+    model, metadata = model_store.load_model(path)
+    if model is None:
+        print("No saved model for this dataset and parameters, training it once")
+        random.seed(1000)
+        dataDF, _ = load_dataset(args.data, cache_dir=None if args.no_cache else args.cache_dir)
+        X_train, y_train, _, _ = preprocess(dataDF)
+        X_train_smote, y_train_smote = resample(args, X_train, y_train)
+        model = build_model().fit(X_train_smote, y_train_smote)
+        metadata = model_metadata(dataDF, X_train_smote)
+        model_store.save_model(model, path, metadata)
+    return FraudModel(model, metadata["amount_mean"], metadata["hour_mean"])
+
+
+class PendingRequest:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    # A single worker thread drains the queue: the first request opens a batch which closes once it holds
+    # max_batch_size rows or max_wait_ms have passed, whichever comes first. A request which doesn't fit in the
+    # open batch opens the next one, only a request of more than max_batch_size rows makes a larger batch
+
+    def __init__(self, predict, max_batch_size=64, max_wait_ms=2.0):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.latencies_ns = []
+        self.batch_sizes = []
+        self.first_request = None
+        self.last_response = None
+        # Request taken from the queue which didn't fit in the previous batch, used only by the worker thread
+        self.overflow = None
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, rows):
+        start = time.perf_counter_ns()
+        request = PendingRequest(rows)
+        self.queue.put(request)
+        request.done.wait()
+        end = time.perf_counter_ns()
+        with self.lock:
+            self.latencies_ns.append(end - start)
+            self.first_request = self.first_request or start
+            self.last_response = end
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _next_batch(self):
+        batch = [self.overflow or self.queue.get()]
+        self.overflow = None
+        size = len(batch[0].rows)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if size + len(request.rows) > self.max_batch_size:
+                self.overflow = request
+                break
+            batch.append(request)
+            size += len(request.rows)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                probabilities = self.predict(np.concatenate([request.rows for request in batch]))
+                offset = 0
+                for request in batch:
+                    request.result = probabilities[offset:offset + len(request.rows)]
+                    offset += len(request.rows)
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+            with self.lock:
+                self.batch_sizes.append(sum(len(request.rows) for request in batch))
+            for request in batch:
+                request.done.set()
+
+    def reset(self):
+        with self.lock:
+            self.latencies_ns = []
+            self.batch_sizes = []
+            self.first_request = None
+            self.last_response = None
+
+    def stats(self):
+        with self.lock:
+            latencies_ns = list(self.latencies_ns)
+            batch_sizes = list(self.batch_sizes)
+            elapsed_s = ((self.last_response - self.first_request) / 1e9) if latencies_ns else 0.0
+        if not latencies_ns:
+            return {"requests": 0}
+        latency = benchmark.summarize(latencies_ns)
+        return {
+            "requests": len(latencies_ns),
+            "latency_p50_s": latency["median_s"],
+            "latency_p99_s": latency["p99_s"],
+            "latency_max_s": latency["max_s"],
+            "throughput_rps": len(latencies_ns) / elapsed_s if elapsed_s else None,
+            "batches": len(batch_sizes),
+            "mean_batch_size": sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0.0,
+            "max_batch_size": max(batch_sizes) if batch_sizes else 0,
+        }
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections, otherwise the TCP handshake dominates single-row latency, and no Nagle delay
+    # between the header and body writes of a response
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    batcher = None
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path == "/stats/reset":
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.batcher.reset()
+            return self._reply(200, {"requests": 0})
+        if self.path != "/predict":
+            return self._reply(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            rows = np.asarray(body["rows"], dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+        except (ValueError, KeyError, TypeError) as error:
+            return self._reply(400, {"error": "expected {\"rows\": [[%s], ...]}: %s" % (", ".join(FEATURE_COLUMNS), error)})
+        try:
+            probabilities = self.batcher.submit(rows)
+        except Exception as error:
+            return self._reply(500, {"error": str(error)})
+        self._reply(200, {"probabilities": probabilities.tolist()})
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, self.batcher.stats())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    args = parse_args()
+
+    start_time = time.time()
+    fraud_model = load_model(args)
+    print("Model Load --- %s seconds ---" % (time.time() - start_time))
+
+    ScoringHandler.batcher = MicroBatcher(fraud_model.predict, args.max_batch_size, args.max_wait_ms)
+    server = ThreadingHTTPServer((args.host, args.port), ScoringHandler)
+    server.daemon_threads = True
+    print("Serving on http://%s:%d (max batch size %d, max wait %sms)"
+          % (args.host, args.port, args.max_batch_size, args.max_wait_ms), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(ScoringHandler.batcher.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
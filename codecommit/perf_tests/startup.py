@@ -0,0 +1,136 @@
+# Process startup and import time of the performance tests (python3 -X importtime)
+#
+# Every target runs in a fresh interpreter with -X importtime, which writes the self and cumulative import time
+# of each module to stderr. The report gives the wall time of the process and the import time per top-level
+# package (the self times of the package and its submodules, a dependency shared by several packages counts
+# once), median of --repeat runs. "eager_imports" loads the libraries classify.py imported at module level
+# before they were deferred to the functions using them, "score" is a short scoring job (saved model, one
+# prediction of the test set) started with -m so its main module comes from the precompiled bytecode as well.
+# "app" is the decision tree script of software_running (headless, 100 points), measured when the repository is
+# checked out next to this directory:
+#
+#   python3 startup.py --repeat 5 --output startup-results.json
+
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import collections
+import benchmark
+
+TARGETS = {
+    "python": ["-c", "pass"],
+    "classify_import": ["-c", "import classify"],
+    "eager_imports": ["-c", "import pandas, xgboost, sklearn.model_selection, imblearn.over_sampling"],
+    "score": ["-m", "classify", "--inference-only", "--warmup", "0", "--repeat", "1", "--output", os.devnull],
+    # Relative to this directory, the working directory of the targets
+    "app": [os.path.join("..", "software_running", "app.py"), "--no-plot"],
+}
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# "import time:       473 |     154712 | classify", two more spaces per nesting level
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def parse_importtime(stderr):
+    # (module, self time in microseconds) per imported module, other stderr lines (warnings) are skipped
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line.rstrip())
+        if match:
+            self_us, _, _, module = match.groups()
+            modules.append((module, int(self_us)))
+    return modules
+
+
+def package_times(modules):
+    # Self time per top-level package in microseconds
+    packages = collections.Counter()
+    for module, self_us in modules:
+        packages[module.split(".")[0]] += self_us
+    return packages
+
+
+def available_targets():
+    # Targets running a script of another directory are skipped where it isn't there (the performance test image)
+    return [target for target, command in TARGETS.items()
+            if command[0] in ("-c", "-m") or os.path.isfile(os.path.join(SCRIPT_DIR, command[0]))]
+
+
+def run_target(command):
+    start = time.perf_counter_ns()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + command, cwd=SCRIPT_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    wall_ns = time.perf_counter_ns() - start
+    if result.returncode != 0:
+        print("\n".join(result.stderr.splitlines()[-20:]))
+        raise SystemExit("%s exited with %d" % (" ".join(command), result.returncode))
+    return wall_ns, parse_importtime(result.stderr)
+
+
+def measure_target(command, warmup, repeat):
+    # Warm-up runs write missing bytecode and let the OS cache the files, like every start after the first
+    for _ in range(warmup):
+        run_target(command)
+    walls, imports, packages = [], [], collections.defaultdict(list)
+    for _ in range(repeat):
+        wall_ns, modules = run_target(command)
+        walls.append(wall_ns)
+        imports.append(sum(self_us for _, self_us in modules) * 1000)
+        for package, self_us in package_times(modules).items():
+            packages[package].append(self_us * 1000)
+    # A package missing from a run took no time in it
+    packages = {package: samples + [0] * (repeat - len(samples)) for package, samples in packages.items()}
+    return walls, imports, packages
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Process startup and import time per package (python3 -X importtime)")
+    parser.add_argument("--targets", nargs="+", default=available_targets(), choices=list(TARGETS),
+                        help="commands to measure (default: all targets whose script exists)")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs per target")
+    parser.add_argument("--repeat", type=int, default=5, help="measured runs per target")
+    parser.add_argument("--top", type=int, default=8, help="packages per target reported as phases (all are in the config)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="smallest median import time of a package reported as a phase")
+    parser.add_argument("--output", default="startup-results.json", help="JSON result file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    phases = {}
+    packages = {}
+    for target in args.targets:
+        walls, imports, target_packages = measure_target(TARGETS[target], args.warmup, args.repeat)
+        phases[target] = benchmark.summarize(walls)
+        phases["%s_imports" % target] = benchmark.summarize(imports)
+        medians = sorted(((statistics.median(samples), package) for package, samples in target_packages.items()), reverse=True)
+        packages[target] = {package: median_ns / 1e9 for median_ns, package in medians}
+        for median_ns, package in medians[:args.top]:
+            if median_ns < args.min_ms * 1e6:
+                break
+            phases["%s_import_%s" % (target, package)] = benchmark.summarize(target_packages[package])
+
+    print("\n\n")
+    for target in args.targets:
+        wall_s, imports_s = phases[target]["median_s"], phases["%s_imports" % target]["median_s"]
+        print("Startup %s --- %.3f seconds, imports %.3f seconds (%.0f%%) ---" % (target, wall_s, imports_s,
+                                                                                100 * imports_s / wall_s))
+        for package, seconds in list(packages[target].items())[:args.top]:
+            print("    %-28s %8.1f ms" % (package, seconds * 1000))
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "targets": {target: TARGETS[target] for target in args.targets},
+        "package_import_s": packages,
+    }
+    benchmark.write_result(args.output, "startup", phases, config)
+    print("Results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
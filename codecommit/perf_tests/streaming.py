@@ -0,0 +1,154 @@
+# Out-of-core training: creditcard.csv is read in chunks and never held in memory as a whole
+#
+# A first pass streams the CSV to compute running means of the normalized columns and the class balance,
+# then XGBoost builds an external-memory DMatrix (pages cached on disk) from a DataIter which streams the
+# CSV again. SMOTE needs every minority row in memory at once, so this mode weights the positive class
+# (scale_pos_weight) instead of oversampling it.
+
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.metrics import roc_auc_score
+from dataset import CSV_DTYPES, FEATURE_COLUMNS, hour_of_day, is_generated, transaction_features
+import benchmark
+import profiling
+
+# Same number of trees as the XGBClassifier default
+NUM_BOOST_ROUNDS = 100
+
+
+def read_chunks(csv_path, chunk_size, test_size, seed):
+    # The train/test assignment of a row only depends on its position, so every pass sees the same split
+    for index, chunk in enumerate(pd.read_csv(csv_path, dtype=CSV_DTYPES, chunksize=chunk_size)):
+        is_test = np.random.default_rng([seed, index]).random(len(chunk)) < test_size
+        yield chunk[FEATURE_COLUMNS].to_numpy(), chunk["Class"].to_numpy(), is_test
+
+
+class RunningStats:
+
+    def __init__(self):
+        self.rows = 0
+        self.positives = 0
+        self.amount_sum = 0.0
+        self.hour_sum = 0.0
+
+    def update(self, rows, labels):
+        self.rows += len(rows)
+        self.positives += int(labels.sum())
+        self.amount_sum += float(rows[:, -1].sum(dtype=np.float64))
+        self.hour_sum += float(hour_of_day(rows[:, 0]).sum(dtype=np.int64))
+
+    @property
+    def amount_mean(self):
+        return self.amount_sum / self.rows
+
+    @property
+    def hour_mean(self):
+        return self.hour_sum / self.rows
+
+
+class ChunkIter(xgboost.DataIter):
+    # Feeds one CSV chunk at a time to XGBoost, which writes the data as pages under cache_prefix
+
+    def __init__(self, csv_path, chunk_size, split_params, stats, cache_prefix):
+        super().__init__(cache_prefix=cache_prefix)
+        self.csv_path = csv_path
+        self.chunk_size = chunk_size
+        self.split_params = split_params
+        self.stats = stats
+        self.chunks = None
+
+    def next(self, input_data):
+        if self.chunks is None:
+            self.reset()
+        for rows, labels, is_test in self.chunks:
+            train = ~is_test
+            if train.any():
+                input_data(data=transaction_features(rows[train], self.stats.amount_mean, self.stats.hour_mean),
+                           label=labels[train])
+                return 1
+        return 0
+
+    def reset(self):
+        self.chunks = read_chunks(self.csv_path, self.chunk_size, self.split_params["test_size"],
+                                  self.split_params["random_state"])
+
+
+def report(phases, name, label, start):
+    phases[name] = benchmark.summarize([time.perf_counter_ns() - start])
+    phases[name]["peak_rss_mb"] = benchmark.peak_rss_mb()
+    print("%s --- %s seconds, peak RSS %.1f MB ---" % (label, phases[name]["median_s"], phases[name]["peak_rss_mb"]))
+
+
+def run_streaming(args, model_params, split_params):
+    if is_generated(args.data):
+        raise SystemExit("--streaming reads a CSV, a synthetic dataset is memory-mapped already (use --lean)")
+    phases = {}
+    test_size, seed = split_params["test_size"], split_params["random_state"]
+    print("\n\n")
+
+    start = time.perf_counter_ns()
+    train_stats, test_stats = RunningStats(), RunningStats()
+    with profiling.phase("statistics") as counters:
+        for rows, labels, is_test in read_chunks(args.data, args.chunk_size, test_size, seed):
+            train_stats.update(rows[~is_test], labels[~is_test])
+            test_stats.update(rows[is_test], labels[is_test])
+        counters["rows"] = train_stats.rows + test_stats.rows
+    report(phases, "statistics", "Streaming Statistics", start)
+
+    start = time.perf_counter_ns()
+    # With --no-cache the pages go to a temporary directory, removed after training
+    if args.no_cache:
+        page_dir = tempfile.mkdtemp(prefix="xgboost-external-")
+    else:
+        page_dir = os.path.join(args.cache_dir, "xgboost-external")
+        shutil.rmtree(page_dir, ignore_errors=True)
+        os.makedirs(page_dir)
+    cache_prefix = os.path.join(page_dir, "pages")
+    try:
+        with profiling.phase("dmatrix", rows=train_stats.rows):
+            dtrain = xgboost.DMatrix(ChunkIter(args.data, args.chunk_size, split_params, train_stats, cache_prefix))
+        report(phases, "dmatrix", "External Memory DMatrix", start)
+
+        start = time.perf_counter_ns()
+        params = dict(model_params, tree_method="hist",
+                      scale_pos_weight=(train_stats.rows - train_stats.positives) / max(train_stats.positives, 1))
+        with profiling.phase("train", rows=train_stats.rows):
+            booster = xgboost.train(params, dtrain, num_boost_round=NUM_BOOST_ROUNDS)
+        report(phases, "train", "Model Training", start)
+        # XGBoost removes its page files once the DMatrix is released
+        del dtrain
+    finally:
+        if args.no_cache:
+            shutil.rmtree(page_dir, ignore_errors=True)
+
+    # Test rows are normalized with their own means, as in classify.py
+    start = time.perf_counter_ns()
+    y_true, y_pred = [], []
+    with profiling.phase("predict", rows=test_stats.rows):
+        for rows, labels, is_test in read_chunks(args.data, args.chunk_size, test_size, seed):
+            if is_test.any():
+                X = transaction_features(rows[is_test], test_stats.amount_mean, test_stats.hour_mean)
+                y_pred.append(booster.predict(xgboost.DMatrix(X)))
+                y_true.append(labels[is_test])
+    report(phases, "predict", "Model Predict", start)
+
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    auc = roc_auc_score(y_true, y_pred) if 0 < y_true.sum() < len(y_true) else None
+    print("Test AUC --- %s ---" % auc)
+    print("\n\n")
+
+    config = {
+        "chunk_size": args.chunk_size,
+        "train_rows": train_stats.rows,
+        "test_rows": test_stats.rows,
+        "num_boost_rounds": NUM_BOOST_ROUNDS,
+        "model_params": params,
+        "test_auc": auc,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud_streaming", phases, config)
+    print("Results written to %s" % args.output)
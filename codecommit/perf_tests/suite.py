@@ -0,0 +1,155 @@
+# Benchmark suite: a registry of workloads measured by one shared runner
+#
+# Each workload is a setup function registered with @workload, it receives the shared SuiteData and returns
+# the callable which is timed (warm-up iterations, then N measured repetitions). All selected workloads are
+# written as the phases of one "benchmark_suite" result, so aggregate.py and gate.py compare them between
+# architectures like the XGBoost phases of classify.py
+
+import argparse
+import functools
+import numpy as np
+from xgboost import XGBClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from dataset import load_arrays, load_dataset
+from lean import lean_preprocess
+from classify import MODEL_PARAMS, SPLIT_PARAMS
+import benchmark
+
+WORKLOADS = {}
+
+MATMUL_SIZE = 2048
+FFT_SIZE = 2048
+
+
+def workload(name, description):
+    def register(setup):
+        WORKLOADS[name] = (setup, description)
+        return setup
+    return register
+
+
+class SuiteData:
+    # Inputs shared by the workloads, loaded once on first use and not part of the measurements
+
+    def __init__(self, csv_path, cache_dir):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+
+    @functools.cached_property
+    def matrices(self):
+        # Same split and normalization as classify.py, as float32 matrices: X_train, y_train, X_test, y_test
+        (features, labels, hours), _ = load_arrays(self.csv_path, self.cache_dir)
+        return lean_preprocess(features, labels, hours, SPLIT_PARAMS)
+
+    @functools.cached_property
+    def frame(self):
+        dataDF, _ = load_dataset(self.csv_path, self.cache_dir)
+        return dataDF
+
+
+@workload("xgboost_hist", "XGBoost training, hist tree method")
+def xgboost_hist(data):
+    X_train, y_train, _, _ = data.matrices
+    return lambda: XGBClassifier(**dict(MODEL_PARAMS, tree_method="hist")).fit(X_train, y_train)
+
+
+@workload("sklearn_random_forest", "scikit-learn RandomForestClassifier training, 50 trees of depth 12 on all cores")
+def sklearn_random_forest(data):
+    X_train, y_train, _, _ = data.matrices
+    return lambda: RandomForestClassifier(n_estimators=50, max_depth=12, n_jobs=-1, random_state=1234).fit(X_train, y_train)
+
+
+@workload("sklearn_logistic_regression", "scikit-learn LogisticRegression training (lbfgs)")
+def sklearn_logistic_regression(data):
+    X_train, y_train, _, _ = data.matrices
+    return lambda: LogisticRegression(max_iter=1000).fit(X_train, y_train)
+
+
+@workload("numpy_matmul", "NumPy float32 matrix multiplication (BLAS), %dx%d" % (MATMUL_SIZE, MATMUL_SIZE))
+def numpy_matmul(data):
+    rng = np.random.default_rng(1234)
+    a = rng.random((MATMUL_SIZE, MATMUL_SIZE), dtype=np.float32)
+    b = rng.random((MATMUL_SIZE, MATMUL_SIZE), dtype=np.float32)
+    return lambda: a @ b
+
+
+@workload("numpy_fft", "NumPy 2-D real FFT and inverse, %dx%d" % (FFT_SIZE, FFT_SIZE))
+def numpy_fft(data):
+    signal = np.random.default_rng(1234).random((FFT_SIZE, FFT_SIZE))
+    return lambda: np.fft.irfft2(np.fft.rfft2(signal), s=signal.shape)
+
+
+@workload("pandas_groupby_join", "pandas groupby aggregation per hour and class joined back to every transaction")
+def pandas_groupby_join(data):
+    dataDF = data.frame[["Hour", "Class", "Amount"]]
+
+    def run():
+        stats = dataDF.groupby(["Hour", "Class"])["Amount"].agg(["mean", "std", "count"]).reset_index()
+        joined = dataDF.merge(stats, on=["Hour", "Class"], how="left")
+        return (joined["Amount"] - joined["mean"]) / joined["std"]
+    return run
+
+
+@workload("python_loop", "Pure-Python loop over every transaction (interpreter bound)")
+def python_loop(data):
+    amounts, hours = data.frame["Amount"].tolist(), data.frame["Hour"].tolist()
+
+    def run():
+        totals, counts, large = {}, {}, 0
+        for amount, hour in zip(amounts, hours):
+            totals[hour] = totals.get(hour, 0.0) + amount
+            counts[hour] = counts.get(hour, 0) + 1
+            if amount > 1000.0:
+                large += 1
+        return {hour: totals[hour] / counts[hour] for hour in totals}, large
+    return run
+
+
+def run_suite(names, data, warmup=1, repeat=3):
+    phases = {}
+    for name in names:
+        setup, description = WORKLOADS[name]
+        fn = setup(data)
+        phases[name] = benchmark.summarize(benchmark.measure(fn, warmup=warmup, repeat=repeat))
+        phases[name]["description"] = description
+        benchmark.print_summary(name, phases[name])
+    return phases
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark suite of ML, numeric and interpreter-bound workloads")
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS), choices=list(WORKLOADS), help="workloads to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="list the registered workloads and exit")
+    parser.add_argument("--data", default="creditcard.csv", help="path to the credit card dataset CSV")
+    parser.add_argument("--cache-dir", default=".cache", help="directory of the binary dataset cache")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the CSV, without reading or writing the cache")
+    parser.add_argument("--warmup", type=int, default=1, help="warm-up iterations per workload (not measured)")
+    parser.add_argument("--repeat", type=int, default=3, help="measured repetitions per workload")
+    parser.add_argument("--output", default="suite-results.json", help="JSON result file (timings, CPU architecture, core count, library versions)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.list:
+        for name, (_, description) in WORKLOADS.items():
+            print("%-28s %s" % (name, description))
+        return
+
+    data = SuiteData(args.data, None if args.no_cache else args.cache_dir)
+    print("\n\n")
+    phases = run_suite(args.workloads, data, warmup=args.warmup, repeat=args.repeat)
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "workloads": args.workloads,
+    }
+    benchmark.write_result(args.output, "benchmark_suite", phases, config)
+    print("Results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Synthetic credit card transactions at any scale, in the layout of the binary dataset cache
+#
+# The rows follow the schema of creditcard.csv: Time (seconds since the first transaction, over two days), the
+# PCA components V1..V28 (centred, decreasing variance), Amount (log-normal like card payments) and an
+# imbalanced Class (0.17% fraud, shifted on the components which separate fraud in the real data). Rows are
+# generated and written chunk by chunk into memory-mapped .npy files, the memory use doesn't depend on the size.
+# The feature matrix is column-major (every column contiguous on disk), next to the class and hour columns,
+# and the directory is given to classify.py instead of the CSV:
+#
+#   python3 synthetic.py --rows 10M --output synthetic/creditcard-10M
+#   python3 classify.py --data synthetic/creditcard-10M --lean
+
+import os
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+from dataset import CACHE_FILES, FEATURE_COLUMNS, MANIFEST, hour_of_day, is_generated, utc_offset
+
+MIN_ROWS, MAX_ROWS = 10_000, 100_000_000
+ROW_SUFFIXES = {"k": 1_000, "M": 1_000_000}
+# Two days of transactions, fraud share and Amount distribution (median 22, mean 88) of creditcard.csv
+TIME_SPAN_S = 172_800
+FRAUD_RATE = 0.00173
+AMOUNT_LOG_MEAN, AMOUNT_LOG_SIGMA = 3.09, 1.66
+# Standard deviation of V1..V28 and their mean in fraud rows, rounded from creditcard.csv
+COMPONENT_STD = np.array([1.96, 1.65, 1.52, 1.42, 1.38, 1.33, 1.24, 1.19, 1.10, 1.09, 1.02, 1.00, 1.00, 0.96,
+                          0.92, 0.88, 0.85, 0.84, 0.81, 0.77, 0.73, 0.73, 0.62, 0.61, 0.52, 0.48, 0.40, 0.33], dtype=np.float32)
+FRAUD_SHIFT = np.array([-4.8, 3.6, -7.0, 4.5, -3.2, -1.4, -5.6, 0.6, -2.6, -5.7, 3.8, -6.3, -0.1, -7.0,
+                        -0.1, -4.1, -6.7, -2.2, 0.7, 0.4, 0.7, 0.0, 0.0, -0.1, 0.0, 0.1, 0.2, 0.1], dtype=np.float32)
+# Version of the generator, part of the manifest: a change to the distributions is a different dataset
+GENERATOR_VERSION = 1
+
+
+def parse_rows(value):
+    # 10000, 10k, 2.5M, ...
+    scale = ROW_SUFFIXES.get(value[-1:], 1)
+    try:
+        rows = int(float(value[:-1] if scale > 1 else value) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid number of rows '%s'" % value)
+    if not MIN_ROWS <= rows <= MAX_ROWS:
+        raise argparse.ArgumentTypeError("rows must be between 10k and 100M")
+    return rows
+
+
+def row_label(rows):
+    for suffix, scale in (("M", 1_000_000), ("k", 1_000)):
+        if rows >= scale and rows % scale == 0:
+            return "%d%s" % (rows // scale, suffix)
+    return str(rows)
+
+
+def dataset_bytes(rows):
+    # features.npy (float32) + class.npy and hour.npy (int8)
+    return rows * (len(FEATURE_COLUMNS) * 4 + 2)
+
+
+def generate_chunk(rng, start, rows, total_rows, fraud_rate):
+    # Rows start .. start + rows of the dataset in FEATURE_COLUMNS order, and their labels
+    features = np.empty((rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+    labels = rng.random(rows) < fraud_rate
+    # Whole seconds, increasing over the dataset like the transaction log
+    features[:, 0] = np.floor((np.arange(start, start + rows) + rng.random(rows)) * (TIME_SPAN_S / total_rows))
+    features[:, 1:-1] = rng.standard_normal((rows, len(COMPONENT_STD)), dtype=np.float32) * COMPONENT_STD
+    features[labels, 1:-1] += FRAUD_SHIFT
+    features[:, -1] = np.round(rng.lognormal(AMOUNT_LOG_MEAN, AMOUNT_LOG_SIGMA, rows), 2)
+    return features, labels.astype(np.int8)
+
+
+def dataset_params(rows, seed, chunk_rows, fraud_rate):
+    # Chunks have their own random stream, the rows depend on the chunk size as well, and the hour column on the
+    # local UTC offset
+    return {"rows": rows, "seed": seed, "chunk_rows": chunk_rows, "fraud_rate": fraud_rate, "generator": GENERATOR_VERSION,
+            "utc_offset": int(utc_offset())}
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def generate(path, rows, seed=1234, chunk_rows=1_000_000, fraud_rate=FRAUD_RATE):
+    # Returns False when the dataset already exists with the same parameters
+    params = dataset_params(rows, seed, chunk_rows, fraud_rate)
+    if is_generated(path) and read_manifest(path)["params"] == params:
+        return False
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    free = shutil.disk_usage(parent).free
+    if dataset_bytes(rows) > free:
+        raise SystemExit("%s rows need %.1f GB, only %.1f GB free in %s"
+                         % (row_label(rows), dataset_bytes(rows) / 1e9, free / 1e9, parent))
+
+    # Write to a temporary directory first so an interrupted run never leaves a partial dataset behind
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    features_file, class_file, hour_file = (os.path.join(tmp_path, f) for f in CACHE_FILES)
+    features = np.lib.format.open_memmap(features_file, mode="w+", dtype=np.float32,
+                                         shape=(rows, len(FEATURE_COLUMNS)), fortran_order=True)
+    labels = np.lib.format.open_memmap(class_file, mode="w+", dtype=np.int8, shape=(rows,))
+    hours = np.lib.format.open_memmap(hour_file, mode="w+", dtype=np.int8, shape=(rows,))
+    frauds = 0
+    for index, start in enumerate(range(0, rows, chunk_rows)):
+        chunk_features, chunk_labels = generate_chunk(np.random.default_rng([seed, index]), start,
+                                                      min(chunk_rows, rows - start), rows, fraud_rate)
+        end = start + len(chunk_labels)
+        features[start:end] = chunk_features
+        labels[start:end] = chunk_labels
+        hours[start:end] = hour_of_day(chunk_features[:, 0])
+        frauds += int(chunk_labels.sum())
+    for array in (features, labels, hours):
+        array.flush()
+    del features, labels, hours
+
+    with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+        json.dump({"params": params, "frauds": frauds, "columns": FEATURE_COLUMNS + ["Class", "Hour"],
+                   "features_order": "column-major"}, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Synthetic credit card dataset (creditcard.csv schema) of 10k to 100M rows")
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("1M"), help="number of transactions, e.g. 100k, 10M (10k to 100M)")
+    parser.add_argument("--output", default=None, help="dataset directory (default: synthetic/creditcard-<rows>)")
+    parser.add_argument("--seed", type=int, default=1234, help="seed of the random streams")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="rows generated and written per step")
+    parser.add_argument("--fraud-rate", type=float, default=FRAUD_RATE, help="share of fraud transactions (Class 1)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    path = args.output or os.path.join("synthetic", "creditcard-%s" % row_label(args.rows))
+    start_time = time.time()
+    if generate(path, args.rows, args.seed, args.chunk_rows, args.fraud_rate):
+        manifest = read_manifest(path)
+        print("Generated %s (%d rows, %d frauds, %.1f MB) --- %s seconds ---"
+              % (path, args.rows, manifest["frauds"], dataset_bytes(args.rows) / 1e6, time.time() - start_time))
+    else:
+        print("%s already exists with the same parameters" % path)
+
+
+if __name__ == "__main__":
+    main()
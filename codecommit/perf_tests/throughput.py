@@ -0,0 +1,123 @@
+# Multi-process scoring throughput: K worker processes predict batches of the test set concurrently
+#
+# The test matrix is copied once into a multiprocessing.shared_memory block which every worker maps
+# without pickling a copy, each worker loads the saved model once and scores with a fixed number of
+# threads. A round is one task per worker, which loops over the batches of its own contiguous slice of
+# the matrix, so nothing but the start of the round and the counts go through the process pool.
+# Aggregate and per-worker predictions/second are reported for K = 1, 2, 4, ... up to the core count, so
+# the point where memory bandwidth and shared caches saturate can be compared between architectures.
+
+import time
+import statistics
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import model_store
+import benchmark
+
+# State of a worker process, set once by init_worker
+_worker = {}
+
+
+def init_worker(model_path, shm_name, shape, dtype, n_threads, barrier):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    model, _ = model_store.load_model(model_path)
+    booster = model.get_booster()
+    booster.set_param({"nthread": n_threads})
+    _worker.update(shm=shm, X=np.ndarray(shape, dtype=dtype, buffer=shm.buf), booster=booster, barrier=barrier)
+
+
+def predict_slice(start, end, batch_rows, batches):
+    # Scores batches of rows start .. end (wrapping around), returns the predictions and the time they took.
+    # The barrier holds every worker until all of them have a task: each process runs exactly one per round
+    _worker["barrier"].wait()
+    X, booster = _worker["X"], _worker["booster"]
+    predictions = 0
+    offset = start
+    started = time.perf_counter_ns()
+    for _ in range(batches):
+        if offset + batch_rows > end:
+            offset = start
+        predictions += len(booster.inplace_predict(X[offset:offset + batch_rows]))
+        offset += batch_rows
+    return predictions, time.perf_counter_ns() - started
+
+
+def share_matrix(X):
+    shm = shared_memory.SharedMemory(create=True, size=X.nbytes)
+    np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+    return shm
+
+
+def worker_slices(workers, batch_rows, total_rows):
+    # Contiguous (start, end) per worker, at least one batch long: slices overlap when the matrix is too small
+    slice_rows = max(total_rows // workers, batch_rows)
+    starts = [min(i * slice_rows, total_rows - slice_rows) for i in range(workers)]
+    return [(start, start + slice_rows) for start in starts]
+
+
+def run_workers(executor, workers, batch_rows, tasks_per_worker, total_rows, worker_rates=None):
+    # One round: every worker scores tasks_per_worker batches of its slice, returns the number of predictions.
+    # The predictions/second of each worker, timed inside it, are appended to worker_rates
+    slices = worker_slices(workers, batch_rows, total_rows)
+    results = list(executor.map(predict_slice, *zip(*slices), [batch_rows] * workers, [tasks_per_worker] * workers))
+    if worker_rates is not None:
+        worker_rates.extend(predictions / (elapsed_ns / 1e9) for predictions, elapsed_ns in results)
+    return sum(predictions for predictions, _ in results)
+
+
+def run_throughput(args, path, X_test, model_params):
+    X = np.ascontiguousarray(X_test, dtype=np.float32)
+    batch_rows = min(args.batch_rows, len(X))
+    worker_counts = benchmark.scaling_steps(args.max_workers)
+    # spawn instead of fork, forking after XGBoost/OpenMP started threads in this process isn't safe
+    context = multiprocessing.get_context("spawn")
+    phases = {}
+
+    shm = share_matrix(X)
+    try:
+        print("\n\n")
+        print("%8s %16s %18s %12s %9s %11s" % ("workers", "predictions/s", "per worker (/s)", "median (s)",
+                                                "speedup", "efficiency"))
+        baseline = None
+        for workers in worker_counts:
+            barrier = context.Barrier(workers)
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                     initargs=(path, shm.name, X.shape, X.dtype, args.worker_threads, barrier)) as executor:
+                # Untimed first round: starts the processes and loads the model in each of them
+                predictions = run_workers(executor, workers, batch_rows, args.tasks_per_worker, len(X))
+                for _ in range(args.warmup):
+                    run_workers(executor, workers, batch_rows, args.tasks_per_worker, len(X))
+                worker_rates = []
+                summary = benchmark.summarize(benchmark.measure(
+                    lambda: run_workers(executor, workers, batch_rows, args.tasks_per_worker, len(X), worker_rates),
+                    warmup=0, repeat=args.repeat))
+            summary["workers"] = workers
+            summary["predictions"] = predictions
+            summary["predictions_per_s"] = predictions / summary["median_s"]
+            summary["worker_predictions_per_s"] = statistics.median(worker_rates)
+            baseline = baseline or summary["predictions_per_s"]
+            summary["speedup"] = summary["predictions_per_s"] / baseline
+            summary["efficiency"] = summary["speedup"] / workers
+            phases["predict_k%d" % workers] = summary
+            print("%8d %16.0f %18.0f %12.5f %8.2fx %10.1f%%" % (workers, summary["predictions_per_s"],
+                                                                summary["worker_predictions_per_s"], summary["median_s"],
+                                                                summary["speedup"], summary["efficiency"] * 100))
+        print("\n\n")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "test_rows": len(X),
+        "batch_rows": batch_rows,
+        "tasks_per_worker": args.tasks_per_worker,
+        "worker_threads": args.worker_threads,
+        "worker_counts": worker_counts,
+        "model_params": model_params,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud_throughput", phases, config)
+    print("Results written to %s" % args.output)
@@ -0,0 +1,117 @@
+# Compiled tree inference: Treelite turns the saved XGBoost booster into C code, which is compiled for the
+# CPU of the host and loaded as a shared library
+#
+# The code is compiled with -march=native on x86_64 and -mcpu=native on arm64 (NEON and the extensions of
+# the Graviton generation) and cached next to the saved model. The benchmark compares it with the stock
+# XGBClassifier.predict_proba path on the whole test set (batched) and on single rows (one call per
+# transaction, like the serving path), and fails when the probabilities differ by more than the tolerance.
+# Treelite is only imported in this mode
+
+import os
+import time
+import hashlib
+import platform
+import warnings
+import numpy as np
+import benchmark
+import model_store
+
+NATIVE_FLAGS = {"x86_64": ["-O3", "-march=native"], "aarch64": ["-O3", "-mcpu=native"]}
+# Untimed single-row calls before the measured ones
+ROW_WARMUP = 100
+
+
+def compiler_flags():
+    return NATIVE_FLAGS.get(platform.machine(), ["-O3"])
+
+
+def library_path(model_path):
+    # Code compiled for one CPU may not run on another, the key includes the CPU model and the flags
+    import treelite
+    payload = "%s %s %s %s" % (treelite.__version__, platform.machine(), benchmark.cpu_model(), " ".join(compiler_flags()))
+    return "%s.treelite-%s.so" % (model_path, hashlib.sha256(payload.encode()).hexdigest()[:16])
+
+
+def compile_model(model, libpath):
+    import treelite
+    warnings.filterwarnings("ignore", message=".*scheduled for removal in Treelite 4.0")
+    tl_model = treelite.Model.from_xgboost(model.get_booster())
+    # parallel_comp splits the generated code into one file per core, compiled concurrently
+    tl_model.export_lib(toolchain="gcc", libpath=libpath + ".tmp.so", params={"parallel_comp": os.cpu_count()},
+                        options=compiler_flags(), verbose=False)
+    os.replace(libpath + ".tmp.so", libpath)
+
+
+def load_predictor(libpath):
+    import treelite_runtime
+    # Treelite 3.9 points to its successor (TL2cgen) on every use of the runtime classes
+    warnings.filterwarnings("ignore", message=".*scheduled for removal in Treelite 4.0")
+    predictor = treelite_runtime.Predictor(libpath, verbose=False)
+    return lambda X: np.ravel(predictor.predict(treelite_runtime.DMatrix(X, dtype="float32")))
+
+
+def measure_rows(predict, rows):
+    # Latency of every single-row call, and the predictions of the measured calls
+    for row in rows[:ROW_WARMUP]:
+        predict(row)
+    samples, predictions = [], []
+    for row in rows:
+        start = time.perf_counter_ns()
+        prediction = predict(row)
+        samples.append(time.perf_counter_ns() - start)
+        predictions.append(prediction[0])
+    return samples, np.array(predictions)
+
+
+def run_treelite(args, path, X_test, model_params):
+    model, _ = model_store.load_model(path)
+    libpath = library_path(path)
+    phases = {}
+    if not os.path.isfile(libpath):
+        start = time.perf_counter_ns()
+        compile_model(model, libpath)
+        phases["compile"] = benchmark.summarize([time.perf_counter_ns() - start])
+    compiled = load_predictor(libpath)
+    stock = lambda X: model.predict_proba(X)[:,1]
+
+    X = np.ascontiguousarray(X_test.to_numpy(), dtype=np.float32)
+    single_rows = min(args.single_rows, len(X_test))
+    stock_rows = [X_test.iloc[i:i + 1] for i in range(single_rows)]
+    compiled_rows = [X[i:i + 1] for i in range(single_rows)]
+
+    expected = stock(X_test)
+    max_abs_diff = float(np.max(np.abs(expected - compiled(X))))
+    for name, predict, batch, rows in (("xgboost", stock, X_test, stock_rows), ("treelite", compiled, X, compiled_rows)):
+        phases["predict_batch_%s" % name] = benchmark.summarize(benchmark.measure(lambda: predict(batch),
+                                                                                  warmup=args.warmup, repeat=args.repeat))
+        samples, predictions = measure_rows(predict, rows)
+        phases["predict_row_%s" % name] = benchmark.summarize(samples)
+        max_abs_diff = max(max_abs_diff, float(np.max(np.abs(expected[:single_rows] - predictions))))
+
+    print("\n\n")
+    if "compile" in phases:
+        print("Treelite Compile (%s) --- %s seconds ---" % (" ".join(compiler_flags()), phases["compile"]["median_s"]))
+    for mode in ("batch", "row"):
+        for name in ("xgboost", "treelite"):
+            benchmark.print_summary("Model Predict %s (%s)" % (mode, name), phases["predict_%s_%s" % (mode, name)])
+        print("Treelite speedup (%s) --- %.2fx ---" % (mode, phases["predict_%s_xgboost" % mode]["median_s"] /
+                                                       phases["predict_%s_treelite" % mode]["median_s"]))
+    print("Max abs difference --- %.3g (tolerance %.3g) ---" % (max_abs_diff, args.tolerance))
+    print("\n\n")
+
+    config = {
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "test_rows": len(X_test),
+        "single_rows": single_rows,
+        "compiler_flags": compiler_flags(),
+        "library_file": os.path.basename(libpath),
+        "max_abs_diff": max_abs_diff,
+        "tolerance": args.tolerance,
+        "model_params": model_params,
+    }
+    benchmark.write_result(args.output, "xgboost_fraud_treelite", phases, config)
+    print("Results written to %s" % args.output)
+    if max_abs_diff > args.tolerance:
+        raise SystemExit("Treelite predictions differ from XGBoost by %.3g, more than the tolerance %.3g"
+                         % (max_abs_diff, args.tolerance))
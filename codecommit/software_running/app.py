@@ -1,31 +1,68 @@
+import time
+import argparse
 import numpy as np
-from sklearn.tree import DecisionTreeRegressor
-import matplotlib.pyplot as plt
-
-# Create random dataset
-rng = np.random.RandomState(1)
-X = np.sort(5 * rng.rand(100, 1), axis=0)
-y = np.sin(X).ravel()
-y[::5] += 3 * (0.5 - rng.rand(20))
-
-# Fit regression model
-dtreg_1 = DecisionTreeRegressor(max_depth=2)
-dtreg_2 = DecisionTreeRegressor(max_depth=5)
-dtreg_1.fit(X, y)
-dtreg_2.fit(X, y)
-
-# Predict
-X_test = np.arange(0.0, 5.0, 0.01)[:, np.newaxis]
-y_1 = dtreg_1.predict(X_test)
-y_2 = dtreg_2.predict(X_test)
-
-# Plot results
-plt.figure()
-plt.scatter(X, y, s=20, edgecolor="black", c="orange", label="data")
-plt.plot(X_test, y_1, color="blue", label="max_depth=2", linewidth=2)
-plt.plot(X_test, y_2, color="green", label="max_depth=5", linewidth=2)
-plt.xlabel("data")
-plt.ylabel("target")
-plt.title("Decision Tree Regression")
-plt.legend()
-plt.savefig("plot.png")
+
+
+def dataset_size(value):
+    size = int(value)
+    if not 100 <= size <= 10_000_000:
+        raise argparse.ArgumentTypeError("size must be between 100 and 10000000 points")
+    return size
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Decision tree regression on a random dataset")
+    parser.add_argument("--size", type=dataset_size, default=100, help="number of points of the random dataset (100 to 10M)")
+    parser.add_argument("--depths", type=int, nargs="+", default=[2, 5], help="max_depth of each regression model")
+    parser.add_argument("--no-plot", action="store_true", help="headless benchmark: predict on --size points and skip matplotlib")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # scikit-learn (and SciPy with it) after the arguments, --help and invalid arguments return without loading it
+    from sklearn.tree import DecisionTreeRegressor
+
+    # Create random dataset
+    rng = np.random.RandomState(1)
+    X = np.sort(5 * rng.rand(args.size, 1), axis=0)
+    y = np.sin(X).ravel()
+    y[::5] += 3 * (0.5 - rng.rand(len(y[::5])))
+
+    # Fit regression models
+    models = {}
+    for depth in args.depths:
+        start_time = time.perf_counter()
+        models[depth] = DecisionTreeRegressor(max_depth=depth).fit(X, y)
+        print("Fit (max_depth=%d, %d points) --- %s seconds ---" % (depth, args.size, time.perf_counter() - start_time))
+
+    # Predict, the benchmark predicts as many points as it was trained on in one vectorized call
+    if args.no_plot:
+        X_test = np.linspace(0.0, 5.0, args.size)[:, np.newaxis]
+    else:
+        X_test = np.arange(0.0, 5.0, 0.01)[:, np.newaxis]
+    predictions = {}
+    for depth, model in models.items():
+        start_time = time.perf_counter()
+        predictions[depth] = model.predict(X_test)
+        print("Predict (max_depth=%d, %d points) --- %s seconds ---" % (depth, len(X_test), time.perf_counter() - start_time))
+
+    # Plot results, matplotlib is only imported when a plot is requested as its import dominates small runs
+    if not args.no_plot:
+        import matplotlib.pyplot as plt
+
+        colors = ["blue", "green", "red", "purple", "brown"]
+        plt.figure()
+        plt.scatter(X, y, s=20, edgecolor="black", c="orange", label="data")
+        for i, depth in enumerate(models):
+            plt.plot(X_test, predictions[depth], color=colors[i % len(colors)], label="max_depth=%d" % depth, linewidth=2)
+        plt.xlabel("data")
+        plt.ylabel("target")
+        plt.title("Decision Tree Regression")
+        plt.legend()
+        plt.savefig("plot.png")
+
+
+if __name__ == "__main__":
+    main()
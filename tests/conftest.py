@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The scripts of the CodeCommit repository import each other by module name, as when run from their directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERF_TESTS = os.path.join(ROOT, "codecommit", "perf_tests")
+NATIVE_BUILD = os.path.join(ROOT, "codecommit", "native_build")
+for directory in (PERF_TESTS, NATIVE_BUILD):
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
@@ -0,0 +1,79 @@
+import pytest
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from arm64_demo.arm64_demo_stack import Arm64DemoStack
+from arm64_demo.workloads import NATIVE_BUILD_SPEC, Build
+
+SEQUENTIAL_STAGES = [
+    ("Source_Code", ["Source_Code"]),
+    ("Concept_1A_Build_Speed_Native", ["Native_Speed_x86_Build", "Native_Speed_arm64_Build",
+                                       "Native_Speed_Multi_Arch_Build"]),
+    ("Concept_1B_Build_Speed_Emulated", ["Emulated_Speed_Multi-Arch_Build"]),
+    ("Concept_1C_Build_Speed_Cross", ["Cross_Speed_Build", "Build_Profile_Report"]),
+    ("Concept_2A_Software_Running", ["Software_Running_x86_Build", "Software_Running_arm64_Build",
+                                     "Software_Running_Multi_Arch_Build"]),
+    ("Concept_2B_Software_Not_Running", ["Python_x86_Build", "Python_arm64_Build", "Nodejs_x86_Build",
+                                         "Nodejs_arm64_Build"]),
+    ("Concept_3A_Runtime_Tests", ["Go_Tests_x86_Build", "Go_Tests_arm64_Build"]),
+    ("Concept_3B_Performance_Tests", ["XGBoost_Perf_x86_Build", "XGBoost_Perf_arm64_Build", "XGBoost_Perf_Report"]),
+]
+# Actions which wait for the builds they depend on in the parallel layout
+DEPENDENT_ACTIONS = {"Native_Speed_Multi_Arch_Build", "Build_Profile_Report", "Software_Running_Multi_Arch_Build",
+                     "XGBoost_Perf_Report"}
+
+
+def synth(**context):
+    app = core.App(context=context)
+    stack = Arm64DemoStack(app, "arm64-demo")
+    return stack, assertions.Template.from_stack(stack)
+
+
+def pipeline_stages(template):
+    pipeline, = template.find_resources("AWS::CodePipeline::Pipeline").values()
+    return pipeline["Properties"]["Stages"]
+
+
+def stage_actions(template):
+    return [(stage["Name"], [action["Name"] for action in stage["Actions"]]) for stage in pipeline_stages(template)]
+
+
+def test_default_layout():
+    _, template = synth()
+    assert stage_actions(template) == SEQUENTIAL_STAGES
+    # One CodeBuild project per build spec, platform, compute type and image
+    template.resource_count_is("AWS::CodeBuild::Project", 11)
+
+
+def test_parallel_layout():
+    _, template = synth(layout="parallel")
+    source, parallel = pipeline_stages(template)
+    assert parallel["Name"] == "Concepts_Parallel"
+    actions = {action["Name"]: action["RunOrder"] for action in parallel["Actions"]}
+    assert sorted(actions) == sorted(name for _, names in SEQUENTIAL_STAGES[1:] for name in names)
+    assert {name for name, run_order in actions.items() if run_order == 2} == DEPENDENT_ACTIONS
+    template.resource_count_is("AWS::CodeBuild::Project", 11)
+
+
+def test_sweep_stage():
+    _, template = synth(sweep={"compute_types": {"x86": ["MEDIUM"], "arm64": ["SMALL"]},
+                               "images": {"x86": ["STANDARD_5_0"]}})
+    name, actions = stage_actions(template)[-1]
+    assert name == "Compute_Sweep"
+    assert sorted(actions) == sorted([
+        "Native_Speed_x86_MEDIUM-STANDARD_5_0_Build", "Native_Speed_arm64_SMALL-AMAZON_LINUX_2_ARM_2_Build",
+        "XGBoost_Perf_x86_MEDIUM-STANDARD_5_0_Build", "XGBoost_Perf_arm64_SMALL-AMAZON_LINUX_2_ARM_2_Build",
+    ])
+
+
+@pytest.mark.parametrize("images", [["STANDARD_5_0"], {"arm64": ["STANDARD_5_0"]}])
+def test_sweep_images_are_per_platform(images):
+    with pytest.raises(ValueError):
+        synth(sweep={"images": images})
+
+
+def test_project_id_identifies_its_settings():
+    stack, _ = synth()
+    # Same build spec, platform and compute type as Software_Running_x86_Build, without Docker
+    with pytest.raises(ValueError, match="native_build_x86_LARGE"):
+        stack.build_project(Build("No_Docker_x86_Build", NATIVE_BUILD_SPEC, "x86", docker=False))
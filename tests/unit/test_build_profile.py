@@ -0,0 +1,74 @@
+import os
+import json
+import base64
+
+import pytest
+
+import build_profile
+from tests.conftest import NATIVE_BUILD
+
+
+def read_fixture(name):
+    return build_profile.read_profile(os.path.join(NATIVE_BUILD, "fixtures", name + ".jsonl"))
+
+
+def vertex(digest, name, started, completed=None, **fields):
+    return dict(fields, digest=digest, name=name, started=started, completed=completed)
+
+
+def test_parse_time_keeps_sub_second_precision():
+    assert build_profile.parse_time("2023-06-01T10:00:01.123456789Z") - build_profile.parse_time("2023-06-01T10:00:00Z") \
+        == pytest.approx(1.123456, abs=1e-6)
+    assert build_profile.parse_time(None) is None
+    with pytest.raises(ValueError):
+        build_profile.parse_time("yesterday")
+
+
+def test_describe_matches_steps_across_platforms():
+    native = build_profile.describe("[builder  4/15] RUN git clone -b v1.0.2 https://github.com/awslabs/aws-lc.git aws-lc")
+    emulated = build_profile.describe("[linux/arm64 builder  6/15] RUN git clone -b v1.0.2 https://github.com/awslabs/aws-lc.git aws-lc")
+    assert native["key"] == emulated["key"]
+    assert (native["stage"], native["number"], native["label"]) == ("builder", 4, "RUN aws-lc")
+    assert build_profile.describe("exporting to image")["number"] is None
+
+
+def test_sample_logs():
+    native, cached = read_fixture("native-arm64"), read_fixture("native-arm64-cached")
+    assert (native["dockerfile_steps"], native["cached_steps"], native["errors"]) == (19, 0, [])
+    # Only the last builder step and the copies of its output ran again
+    assert cached["cached_steps"] == 16
+    assert cached["total_s"] < native["total_s"]
+
+
+def test_compare_with_reference():
+    profiles = [read_fixture("native-arm64"), read_fixture("emulated-arm64")]
+    rows = build_profile.compare(profiles, "native-arm64")
+    aws_lc, = [row for row in rows if row["label"] == "RUN aws-lc"]
+    assert aws_lc["builds"]["native-arm64"]["ratio"] == 1.0
+    assert aws_lc["builds"]["emulated-arm64"]["ratio"] > 1.0
+    assert "| **Total** |" in build_profile.markdown_report(profiles, rows, "native-arm64")
+
+
+def test_failed_step_keeps_log_tail_and_cli_messages():
+    step = "[builder 2/3] RUN make"
+    output = "\n".join("line %d" % number for number in range(30)) + "\nerror: undefined reference to `main'\n"
+    lines = [
+        "# comment",
+        json.dumps({"vertexes": [vertex("sha256:1", step, "2023-06-01T10:00:00Z")]}),
+        json.dumps({"logs": [{"vertex": "sha256:1", "data": base64.b64encode(output.encode()).decode()}]}),
+        json.dumps({"vertexes": [vertex("sha256:1", step, "2023-06-01T10:00:00Z", "2023-06-01T10:00:05Z",
+                                        error="process did not complete successfully: exit code: 2")]}),
+        "ERROR: failed to solve: process \"/bin/sh -c make\" did not complete successfully: exit code: 2",
+    ]
+    steps, total_s, messages = build_profile.parse_log(lines)
+    failed, = steps
+    assert total_s == 5.0
+    assert failed["error"].endswith("exit code: 2")
+    assert len(failed["log_tail"]) == build_profile.LOG_TAIL_LINES
+    assert failed["log_tail"][-1] == "error: undefined reference to `main'"
+    assert messages == [lines[-1]]
+
+
+def test_rejects_lines_which_are_not_rawjson():
+    with pytest.raises(ValueError, match="Line 1"):
+        build_profile.parse_log(["{not json"])
@@ -0,0 +1,115 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import dataset
+
+
+def write_csv(path, rows=48, seed=0):
+    # creditcard.csv layout: Time, V1..V28, Amount, Class, one transaction per hour
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        f.write(",".join('"%s"' % column for column in dataset.FEATURE_COLUMNS + ["Class"]) + "\n")
+        for row in range(rows):
+            values = [row * 3600.0] + list(rng.standard_normal(28).round(6)) + [round(rng.uniform(0, 500), 2)]
+            f.write(",".join(str(value) for value in values) + ",%d\n" % (row % 7 == 0))
+    return path
+
+
+def rewrite_csv(path, seed):
+    # A new mtime as well: the digest of an unchanged (path, size, mtime) is reused within the process
+    stat = os.stat(path)
+    write_csv(path, seed=seed)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def cache_entries(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_cache_miss_then_hit(tmp_path):
+    csv_path = write_csv(str(tmp_path / "creditcard.csv"))
+    cache_dir = str(tmp_path / "cache")
+
+    parsed, status = dataset.load_dataset(csv_path, cache_dir)
+    assert status == "miss"
+    cached, status = dataset.load_dataset(csv_path, cache_dir)
+    assert status == "hit"
+    assert cache_entries(cache_dir) == [os.path.basename(dataset.cache_entry(csv_path, cache_dir, dataset.cache_digest(csv_path)))]
+    assert list(cached.columns) == list(parsed.columns)
+    np.testing.assert_array_equal(cached.to_numpy(), parsed.to_numpy())
+
+    (features, labels, hours), status = dataset.load_arrays(csv_path, cache_dir)
+    assert status == "hit"
+    np.testing.assert_array_equal(features, parsed[dataset.FEATURE_COLUMNS].to_numpy())
+    np.testing.assert_array_equal(labels, parsed["Class"].to_numpy())
+    np.testing.assert_array_equal(hours, parsed["Hour"].to_numpy())
+
+
+def test_cache_disabled(tmp_path):
+    csv_path = write_csv(str(tmp_path / "creditcard.csv"))
+    _, status = dataset.load_dataset(csv_path)
+    assert status == "disabled"
+    assert os.listdir(str(tmp_path)) == ["creditcard.csv"]
+
+
+def test_changed_csv_rebuilds_and_removes_stale_entry(tmp_path):
+    csv_path = write_csv(str(tmp_path / "creditcard.csv"))
+    cache_dir = str(tmp_path / "cache")
+    dataset.load_dataset(csv_path, cache_dir)
+    old_entries = cache_entries(cache_dir)
+
+    rewrite_csv(csv_path, seed=1)
+    dataDF, status = dataset.load_dataset(csv_path, cache_dir)
+    assert status == "miss"
+    new_entries = cache_entries(cache_dir)
+    assert len(new_entries) == 1 and new_entries != old_entries
+    np.testing.assert_array_equal(dataDF[dataset.FEATURE_COLUMNS].to_numpy(), dataset.read_csv(csv_path)[dataset.FEATURE_COLUMNS].to_numpy())
+
+
+def test_entries_of_other_csv_files_are_kept(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    dataset.load_dataset(write_csv(str(tmp_path / "creditcard.csv")), cache_dir)
+    dataset.load_dataset(write_csv(str(tmp_path / "creditcard-small.csv"), rows=24), cache_dir)
+    assert [entry.rsplit("-", 1)[0] for entry in cache_entries(cache_dir)] == ["creditcard", "creditcard-small"]
+
+
+def test_cache_is_keyed_by_utc_offset(tmp_path, monkeypatch):
+    csv_path = write_csv(str(tmp_path / "creditcard.csv"))
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setattr(dataset, "utc_offset", lambda: 0.0)
+    utc, _ = dataset.load_dataset(csv_path, cache_dir)
+    utc_digest = dataset.cache_digest(csv_path)
+
+    monkeypatch.setattr(dataset, "utc_offset", lambda: 5.5 * 3600)
+    assert dataset.cache_digest(csv_path) != utc_digest
+    shifted, status = dataset.load_dataset(csv_path, cache_dir)
+    assert status == "miss"
+    # One transaction per hour from Time 0: hour i in UTC is hour i + 5 at +05:30
+    np.testing.assert_array_equal(utc["Hour"].to_numpy()[:10], np.arange(10))
+    np.testing.assert_array_equal(shifted["Hour"].to_numpy()[:10], np.arange(5, 15))
+    _, status = dataset.load_dataset(csv_path, cache_dir)
+    assert status == "hit"
+
+
+@pytest.fixture
+def time_zone(monkeypatch):
+    # Sets the local time zone of the process for datetime.fromtimestamp and restores it afterwards
+    def set_zone(zone):
+        monkeypatch.setenv("TZ", zone)
+        time.tzset()
+    yield set_zone
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.parametrize("zone", ["UTC", "America/New_York", "Asia/Kolkata", "Europe/London", "Australia/Lord_Howe"])
+def test_hour_of_day_matches_datetime(time_zone, zone):
+    # Over the Time range of creditcard.csv (two days from 0), where the fixed UTC offset of hour_of_day holds
+    time_zone(zone)
+    seconds = np.arange(0, 172_800, 60, dtype=np.float32)
+    expected = [datetime.fromtimestamp(t).hour for t in seconds.tolist()]
+    np.testing.assert_array_equal(dataset.hour_of_day(seconds), expected)
@@ -0,0 +1,31 @@
+import os
+import re
+
+import pytest
+
+from tests.conftest import ROOT
+
+# The native, serial, emulated and cross-compiled builds compile the same dependencies in Dockerfiles of their own,
+# native_speed/Dockerfile is the reference for the versions
+REFERENCE = "native_speed/Dockerfile"
+DOCKERFILES = ["native_speed/Dockerfile.serial", "emulated_speed/Dockerfile", "emulated_speed/Dockerfile.serial",
+               "cross_speed/Dockerfile"]
+# "git clone -b v1.0.2 https://github.com/awslabs/aws-lc.git aws-lc", "git clone --depth 1 -b v0.2.1  <url>"
+GIT_CLONE = re.compile(r"git clone\s+(?:--depth\s+\d+\s+)?-b\s+(\S+)\s+\S+://(\S+?)(?:\.git)?(?=\s)")
+
+
+def cloned_tags(dockerfile):
+    with open(os.path.join(ROOT, "codecommit", dockerfile)) as f:
+        clones = GIT_CLONE.findall(f.read())
+    tags = {repository: tag for tag, repository in clones}
+    assert len(tags) == len(clones), "%s clones a repository twice" % dockerfile
+    return tags
+
+
+def test_reference_clones_every_dependency():
+    assert len(cloned_tags(REFERENCE)) == 12
+
+
+@pytest.mark.parametrize("dockerfile", DOCKERFILES)
+def test_dependency_tags_match(dockerfile):
+    assert cloned_tags(dockerfile) == cloned_tags(REFERENCE)
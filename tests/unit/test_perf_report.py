@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import aggregate
+import gate
+import benchmark
+from tests.conftest import PERF_TESTS
+
+
+def run_gate(*results):
+    # gate.py as the report action runs it, against the baseline of the pipeline
+    return subprocess.run([sys.executable, "gate.py", "--baseline", "baseline.json"] + list(results),
+                          cwd=PERF_TESTS, stdout=subprocess.PIPE, universal_newlines=True)
+
+
+def read_fixtures(*names):
+    return benchmark.read_results([os.path.join(PERF_TESTS, "fixtures", name) for name in names])
+
+
+def read_baseline():
+    with open(os.path.join(PERF_TESTS, "baseline.json")) as f:
+        return json.load(f)
+
+
+def sweep_result(result, build_config):
+    result = json.loads(json.dumps(result))
+    result["environment"]["build_config"] = build_config
+    return result
+
+
+def test_gate_passes_sample_results():
+    result = run_gate("fixtures/results-x86.json", "fixtures/results-arm64.json")
+    assert result.returncode == 0, result.stdout
+    assert "FAIL" not in result.stdout
+
+
+def test_gate_fails_regressed_results():
+    result = run_gate("fixtures/results-x86.json", "fixtures/results-arm64-regressed.json")
+    assert result.returncode == 1, result.stdout
+    assert "FAIL xgboost_fraud aarch64" in result.stdout
+
+
+def test_gate_keys_sweep_results_by_build_config():
+    regressed, = read_fixtures("results-arm64-regressed.json")
+    sweep = sweep_result(regressed, "SMALL-AMAZON_LINUX_2_ARM_2")
+    # A slower compute type isn't a regression of the default LARGE builds
+    assert gate.check([sweep], read_baseline(), 0.15) == []
+
+    baseline = gate.update([sweep], read_baseline())
+    assert "aarch64 SMALL-AMAZON_LINUX_2_ARM_2" in baseline["xgboost_fraud"]
+    assert not any(regressed for *_, regressed in gate.check([sweep], baseline, 0.15))
+
+
+def test_aggregate_compares_with_reference():
+    with open(os.path.join(PERF_TESTS, "prices.json")) as f:
+        prices = json.load(f)
+    architectures, rows, hosts = aggregate.compare(read_fixtures("results-x86.json", "results-arm64.json"), prices)
+    assert architectures == ["x86_64", "aarch64"]
+    predict, = [row for row in rows if row["phase"] == "predict"]
+    assert predict["architectures"]["x86_64"]["speedup"] == 1.0
+    assert predict["architectures"]["aarch64"]["speedup"] > 1.0
+    assert hosts["aarch64"]["instance"] == prices["aarch64"]["LARGE"]["instance"]
+
+
+def test_aggregate_prices_sweep_results_by_compute_type():
+    with open(os.path.join(PERF_TESTS, "prices.json")) as f:
+        prices = json.load(f)
+    x86, = read_fixtures("results-x86.json")
+    sweep = sweep_result(x86, "MEDIUM-STANDARD_5_0")
+    architectures, rows, hosts = aggregate.compare([x86, sweep], prices)
+    assert architectures == ["x86_64", "x86_64 MEDIUM-STANDARD_5_0"]
+    assert hosts["x86_64 MEDIUM-STANDARD_5_0"] == prices["x86_64"]["MEDIUM"]
+    # Same timings on a host at half the price
+    predict, = [row for row in rows if row["phase"] == "predict"]
+    assert predict["architectures"]["x86_64 MEDIUM-STANDARD_5_0"]["price_performance"] == pytest.approx(
+        prices["x86_64"]["LARGE"]["usd_per_hour"] / prices["x86_64"]["MEDIUM"]["usd_per_hour"])